@@ -17,31 +17,41 @@ v0.4.0 新特性：
 
 依赖安装：
     pip install flask opencv-python numpy pillow python-pptx psutil
+    可选：pip install PyTurboJPEG（需系统安装 libjpeg-turbo，加速幻灯片 JPEG 编码）
 
 作者: PWO-CHINA
 版本: v0.6.1
 """
 
 import cv2
-import json
+import csv
+import io
 import os
 import queue
+import re
 import sys
 import shutil
+import tempfile
 import threading
 import time
-import uuid
 import webbrowser
 import socket
+import struct
 import traceback
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 
 from flask import (Flask, request, jsonify, send_file,
                    send_from_directory, render_template, Response)
+from werkzeug.wsgi import FileWrapper
 
 # 导入拆分后的功能模块
-from extractor import extract_slides, probe_gpu
+from extractor import extract_slides, probe_gpu, probe_video_meta, lower_thread_priority
 from exporter import package_images
+from jsonio import SSE_MAX_BATCH, json_bytes, json_loads, sse_data
 
 # ============================================================
 #  无控制台模式兼容
@@ -58,6 +68,17 @@ except ImportError:
     HAS_PSUTIL = False
     print("⚠️  未安装 psutil，系统资源监控将不可用。安装命令: pip install psutil")
 
+try:
+    import pynvml
+    HAS_PYNVML = True
+except ImportError:
+    HAS_PYNVML = False
+
+
+def _json_response(obj):
+    """高频轮询接口直接构造 JSON 响应，绕过 jsonify 的排序与缩进判断"""
+    return Response(json_bytes(obj), mimetype='application/json')
+
 
 # ============================================================
 #  PyInstaller / Nuitka 兼容：资源路径寻路
@@ -113,13 +134,54 @@ def _compute_max_sessions():
 
 MAX_SESSIONS = _compute_max_sessions()
 
+
+def _configure_cv2():
+    """
+    确保启用 OpenCV 的 SIMD 优化路径。
+    并行线程数保持 OpenCV 默认（每核一个）：线程池是进程级共享的，
+    若按 MAX_SESSIONS 均分，最常见的单任务场景也只能用到一部分核。
+    """
+    try:
+        cv2.setUseOptimized(True)
+    except Exception:
+        pass
+
+_configure_cv2()
+
 # 孤儿会话超时时间（秒）：会话无活跃 SSE 连接超过此时间后被视为孤儿
 ORPHAN_SESSION_TIMEOUT = 60
 
+# 会话缓存目录中视为幻灯片图片的扩展名（小写，不含点）
+_IMG_EXTS = frozenset({'jpg', 'jpeg', 'png'})
+
+
+def _is_img_name(name):
+    """按扩展名判断是否为幻灯片图片：只对扩展名做小写转换，集合查找 O(1)"""
+    _, dot, ext = name.rpartition('.')
+    return bool(dot) and ext.lower() in _IMG_EXTS
+
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # 开发阶段禁用静态文件缓存
 
+# send_file 读取文件的块大小：Werkzeug 开发服务器不提供 wsgi.file_wrapper（无 sendfile），
+# 默认按 8 KiB 逐块读写，百 MB 级 PDF/ZIP 下载需要上万次循环；改为 1 MiB 块
+_SEND_FILE_BUFFER = 1024 * 1024
+
+
+def _large_file_wrapper(f, buffer_size=8192):
+    return FileWrapper(f, max(buffer_size, _SEND_FILE_BUFFER))
+
+
+def _with_file_wrapper(wsgi_app):
+    def middleware(environ, start_response):
+        environ.setdefault('wsgi.file_wrapper', _large_file_wrapper)
+        return wsgi_app(environ, start_response)
+    return middleware
+
+
+app.wsgi_app = _with_file_wrapper(app.wsgi_app)
+
 
 # ============================================================
 #  全局错误处理 & CORS
@@ -149,57 +211,109 @@ def handle_error(e):
 # ============================================================
 _sessions_lock = threading.Lock()
 _sessions = {}
+# 处于 running 状态的会话数：由 _publish_state 在状态切换时增减，读取 O(1)
+_running_count = 0
+_running_count_lock = threading.Lock()
 
 CPU_WARN_THRESHOLD = 90
 MEMORY_WARN_THRESHOLD = 85
 DISK_WARN_THRESHOLD_MB = 500
 
-# ── 后台 CPU 采样 ──
-_cpu_cache = {'percent': 0.0}
+# ── 后台 CPU / 内存 / 磁盘采样（请求线程只读缓存，不做同步系统调用）──
+_cpu_cache = {'percent': 0.0, 'mem': None, 'disk': None}
 
 
-def _cpu_sampler_loop():
-    if not HAS_PSUTIL:
-        return
-    psutil.cpu_percent(interval=1)
-    while True:
-        try:
-            _cpu_cache['percent'] = psutil.cpu_percent(interval=0)
-        except Exception:
-            pass
-        time.sleep(2)
+def _sample_cpu():
+    try:
+        _cpu_cache['percent'] = psutil.cpu_percent(interval=0)
+        _cpu_cache['mem'] = psutil.virtual_memory()
+        _cpu_cache['disk'] = psutil.disk_usage(BASE_DIR)
+    except Exception:
+        pass
+
+
+def _sampled_mem_disk():
+    """返回最近一次采样的 (virtual_memory, disk_usage)；采样线程尚未跑完首轮时现取"""
+    mem = _cpu_cache['mem'] or psutil.virtual_memory()
+    disk = _cpu_cache['disk'] or psutil.disk_usage(BASE_DIR)
+    return mem, disk
 
-_cpu_sampler_thread = threading.Thread(target=_cpu_sampler_loop, daemon=True)
-_cpu_sampler_thread.start()
+# system_status 响应缓存：仪表盘 1~2 Hz 轮询时 1 秒内直接复用序列化结果，
+# 不再每次遍历全部会话；会话增删或状态切换时置 ts=0 使其失效
+_SYS_STATUS_TTL = 1.0
+_sys_status_cache = {'ts': 0.0, 'body': b''}
 
 
-# ── 后台 GPU 采样（nvidia-smi 优先，Windows PDH 计数器兜底）──
+def _invalidate_system_status():
+    _sys_status_cache['ts'] = 0.0
+
+
+# ── 后台 GPU 采样（NVML / nvidia-smi 优先，Windows PDH 计数器兜底）──
 import subprocess as _subprocess
 _gpu_cache = {'available': False, 'name': '', 'util': 0, 'mem_used': 0, 'mem_total': 0, 'temperature': 0}
 _CF = 0x08000000 if os.name == 'nt' else 0   # CREATE_NO_WINDOW
 
 
+# 显示适配器设备类的注册表键（驱动写入的 qwMemorySize 为 64 位，不受 AdapterRAM 4 GB 上限影响）
+_DISPLAY_CLASS_KEY = r'SYSTEM\CurrentControlSet\Control\Class\{4d36e968-e325-11ce-bfc1-08002be10318}'
+
+
+def _read_vram_from_registry(name):
+    """从显卡驱动注册表项读取显存总量（MB），找不到时返回 0"""
+    try:
+        import winreg
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, _DISPLAY_CLASS_KEY) as cls:
+            i = 0
+            while True:
+                try:
+                    sub = winreg.EnumKey(cls, i)
+                except OSError:
+                    break
+                i += 1
+                try:
+                    with winreg.OpenKey(cls, sub) as k:
+                        if winreg.QueryValueEx(k, 'DriverDesc')[0] != name:
+                            continue
+                        size = winreg.QueryValueEx(k, 'HardwareInformation.qwMemorySize')[0]
+                        return int(size) // (1024 * 1024)
+                except (OSError, ValueError, TypeError):
+                    continue
+    except Exception:
+        pass
+    return 0
+
+
 def _detect_gpu_name_and_vram():
-    """通过 WMI 检测 GPU 名称和显存总量（适用于所有 GPU）"""
+    """通过 CIM（PowerShell Get-CimInstance）检测 GPU 名称和显存总量（适用于所有 GPU）。
+    wmic 在 Windows 11 新版本中已移除；AdapterRAM 是 32 位字段，大于 4 GB 的显卡以注册表值为准。
+    """
     try:
         r = _subprocess.run(
-            ['wmic', 'path', 'win32_VideoController', 'get', 'name,AdapterRAM', '/format:csv'],
+            ['powershell', '-NoProfile', '-NonInteractive', '-Command',
+             'Get-CimInstance Win32_VideoController | Select-Object Name,AdapterRAM'
+             ' | ConvertTo-Csv -NoTypeInformation'],
             capture_output=True, text=True, timeout=10, creationflags=_CF)
-        for line in r.stdout.strip().split('\n'):
-            parts = [p.strip() for p in line.split(',')]
-            if len(parts) >= 3 and parts[2] not in ('Name', '') and 'Virtual' not in parts[2]:
-                name = parts[2]
-                ram_mb = int(parts[1]) // (1024 * 1024) if parts[1].isdigit() else 0
-                return name, ram_mb
+        rows = csv.reader(io.StringIO(r.stdout))
+        next(rows, None)  # 表头 "Name","AdapterRAM"
+        for row in rows:
+            if len(row) < 2:
+                continue
+            name, ram = row[0].strip(), row[1].strip()
+            if not name or 'Virtual' in name:
+                continue
+            ram_mb = int(ram) // (1024 * 1024) if ram.isdigit() else 0
+            return name, max(ram_mb, _read_vram_from_registry(name))
     except Exception:
         pass
     return '', 0
 
 
 def _discover_pdh_counters():
-    """检测是否有 GPU PDH 计数器可用（快速探测）"""
+    """检测是否有 GPU PDH 计数器可用（快速探测，仅在 PDH 原生查询不可用时调用）。
+    用 -q 只列出计数器名，-qx 会展开每个进程 × 引擎实例，输出可达数 MB。
+    """
     try:
-        r = _subprocess.run(['typeperf', '-qx', 'GPU Engine'],
+        r = _subprocess.run(['typeperf', '-q', 'GPU Engine'],
                             capture_output=True, text=True, timeout=10, creationflags=_CF)
         if 'Utilization Percentage' in r.stdout:
             return True
@@ -210,6 +324,8 @@ def _discover_pdh_counters():
 
 # 持久化的通配符计数器文件路径
 _pdh_counter_file = None
+# 物理引擎 ID（不含 PID，含 luid+phys+eng_N），每次采样对每一列都要匹配
+_PDH_ENG_RE = re.compile(r'luid_\w+_phys_\d+_eng_\d+')
 
 
 def _init_pdh_counter_file():
@@ -247,7 +363,6 @@ def _sample_pdh_counters():
     利用率算法：按物理引擎（luid+phys+eng_N）分组 SUM 各进程占用，再取所有引擎的 MAX。
     这与 Windows 任务管理器的计算方式一致。
     """
-    import re
     util = 0
     mem_used_mb = 0
 
@@ -258,22 +373,21 @@ def _sample_pdh_counters():
         r = _subprocess.run(
             ['typeperf', '-cf', _pdh_counter_file, '-sc', '1'],
             capture_output=True, text=True, timeout=30, creationflags=_CF)
-        out_lines = r.stdout.strip().split('\n')
-        if len(out_lines) < 2:
+        # csv.reader 一次解析全部行（C 实现，正确处理引号）；空行跳过
+        rows = [row for row in csv.reader(io.StringIO(r.stdout)) if row]
+        if len(rows) < 2:
             return util, mem_used_mb
 
-        # 解析表头，确定每列的类型
-        header_cols = [c.strip('"') for c in out_lines[0].split('","')]
-        data_line = None
-        for line in out_lines[1:]:
-            if line.startswith('"') and not line.startswith('"(PDH'):
-                data_line = line
+        # 解析表头，确定每列的类型；数据行与表头列数一致（尾部的提示文字不是）
+        header_cols = rows[0]
+        data_vals = None
+        for row in rows[1:]:
+            if len(row) == len(header_cols) and not row[0].startswith('(PDH'):
+                data_vals = [v.strip() for v in row]
                 break
-        if not data_line:
+        if not data_vals:
             return util, mem_used_mb
 
-        data_vals = [v.strip('" ') for v in data_line.split('","')]
-
         engine_sum = {}   # "luid_..._phys_N_eng_N" -> sum of utilization
         max_dedicated = 0.0
         max_shared = 0.0
@@ -287,7 +401,7 @@ def _sample_pdh_counters():
 
             if 'GPU Engine' in cname:
                 # 提取物理引擎 ID（不含 PID，含 luid+phys+eng_N）
-                m = re.search(r'luid_\w+_phys_\d+_eng_\d+', cname)
+                m = _PDH_ENG_RE.search(cname)
                 eng_key = m.group(0) if m else str(i)
                 engine_sum[eng_key] = engine_sum.get(eng_key, 0.0) + fv
             elif 'Dedicated Usage' in cname:
@@ -308,69 +422,223 @@ def _sample_pdh_counters():
 
 
 
-def _gpu_sampler_loop():
-    """GPU 后台采样主循环，优先 nvidia-smi，不可用时回退 Windows PDH"""
-    import traceback as _tb
+def _init_nvml():
+    """初始化 NVML，返回首块 GPU 的句柄；名称和显存总量只在这里查询一次"""
+    try:
+        pynvml.nvmlInit()
+        h = pynvml.nvmlDeviceGetHandleByIndex(0)
+        name = pynvml.nvmlDeviceGetName(h)
+        if isinstance(name, bytes):  # 旧版绑定返回 bytes
+            name = name.decode('utf-8', 'replace')
+        _gpu_cache['name'] = name
+        _gpu_cache['mem_total'] = pynvml.nvmlDeviceGetMemoryInfo(h).total // (1024 * 1024)
+        _gpu_cache['available'] = True
+        return h
+    except Exception as e:
+        print(f'[GPU监控] NVML 初始化失败，回退 nvidia-smi: {e}', flush=True)
+        return None
+
+# ── PDH 原生查询：ctypes 直接调用 pdh.dll，常驻一个查询句柄，无需每次启动 typeperf ──
+_PDH_FMT_DOUBLE = 0x00000200
+_PDH_MORE_DATA = 0x800007D2
+_PDH_WILDCARD_COUNTERS = (
+    ('engine', r'\GPU Engine(*)\Utilization Percentage'),
+    ('dedicated', r'\GPU Adapter Memory(*)\Dedicated Usage'),
+    ('shared', r'\GPU Adapter Memory(*)\Shared Usage'),
+)
+
+
+def _open_pdh_query():
+    """打开常驻 PDH 查询并添加通配符计数器，返回 (pdh, 计数器句柄字典)；不可用时返回 None"""
     try:
-        _gpu_sampler_loop_inner()
+        import ctypes
+        from ctypes import wintypes
+        pdh = ctypes.WinDLL('pdh')
+        pdh.PdhOpenQueryW.restype = wintypes.LONG
+        pdh.PdhAddEnglishCounterW.restype = wintypes.LONG
+        pdh.PdhCollectQueryData.restype = wintypes.LONG
+        pdh.PdhGetFormattedCounterArrayW.restype = wintypes.LONG
+        hquery = wintypes.HANDLE()
+        if pdh.PdhOpenQueryW(None, 0, ctypes.byref(hquery)) != 0:
+            return None
+        counters = {}
+        for key, path in _PDH_WILDCARD_COUNTERS:
+            hc = wintypes.HANDLE()
+            if pdh.PdhAddEnglishCounterW(hquery, path, 0, ctypes.byref(hc)) == 0:
+                counters[key] = hc
+        if 'engine' not in counters:
+            pdh.PdhCloseQuery(hquery)
+            return None
+        counters['query'] = hquery
+        pdh.PdhCollectQueryData(hquery)  # 首次采集用于建立基准（利用率为速率型计数器）
+        return pdh, counters
     except Exception:
-        print(f'[GPU监控] 线程异常退出:\n{_tb.format_exc()}', flush=True)
+        return None
 
 
-def _gpu_sampler_loop_inner():
-    # ── 第一优先：nvidia-smi（NVIDIA 独显）──
+def _pdh_counter_array(pdh, hcounter):
+    """读取通配符计数器展开后的全部实例，返回 [(实例名, 数值)]"""
+    import ctypes
+    from ctypes import wintypes
+
+    class _FmtValue(ctypes.Structure):
+        _fields_ = [('CStatus', wintypes.DWORD), ('doubleValue', ctypes.c_double)]
+
+    class _FmtItem(ctypes.Structure):
+        _fields_ = [('szName', wintypes.LPWSTR), ('FmtValue', _FmtValue)]
+
+    size = wintypes.DWORD(0)
+    count = wintypes.DWORD(0)
+    status = pdh.PdhGetFormattedCounterArrayW(
+        hcounter, _PDH_FMT_DOUBLE, ctypes.byref(size), ctypes.byref(count), None)
+    if (status & 0xFFFFFFFF) != _PDH_MORE_DATA or not size.value:
+        return []
+    buf = ctypes.create_string_buffer(size.value)
+    status = pdh.PdhGetFormattedCounterArrayW(
+        hcounter, _PDH_FMT_DOUBLE, ctypes.byref(size), ctypes.byref(count), buf)
+    if status != 0:
+        return []
+    items = ctypes.cast(buf, ctypes.POINTER(_FmtItem))
+    # CStatus 0/1 = PDH_CSTATUS_VALID_DATA / NEW_DATA
+    return [(items[i].szName or '', items[i].FmtValue.doubleValue)
+            for i in range(count.value) if items[i].FmtValue.CStatus <= 1]
+
+
+def _sample_pdh_native(pdh, counters):
+    """常驻 PDH 查询采样一次，算法与 _sample_pdh_counters 相同（引擎分组求和后取最大）"""
+    util = 0
+    mem_used_mb = 0
+    try:
+        if pdh.PdhCollectQueryData(counters['query']) != 0:
+            return util, mem_used_mb
+        engine_sum = {}
+        for name, v in _pdh_counter_array(pdh, counters['engine']):
+            # 实例名形如 pid_123_luid_0x..._phys_0_eng_3_engtype_3D，去掉 PID 与引擎类型
+            start = name.find('luid_')
+            end = name.find('_engtype', start)
+            eng_key = name[start:end] if start >= 0 and end > 0 else name
+            engine_sum[eng_key] = engine_sum.get(eng_key, 0.0) + v
+        max_dedicated = max((v for _, v in _pdh_counter_array(pdh, counters['dedicated'])), default=0.0) \
+            if 'dedicated' in counters else 0.0
+        max_shared = max((v for _, v in _pdh_counter_array(pdh, counters['shared'])), default=0.0) \
+            if 'shared' in counters else 0.0
+        util = min(100, round(max(engine_sum.values()))) if engine_sum else 0
+        best_mem = max_dedicated if max_dedicated > 0 else max_shared
+        mem_used_mb = round(best_mem / (1024 * 1024))
+    except Exception:
+        pass
+    return util, mem_used_mb
+
+
+def _init_gpu_sampler():
+    """
+    检测 GPU 并选择采样方式，优先 NVML / nvidia-smi，不可用时回退 Windows PDH。
+    返回 (采样函数, 每隔几个采样周期调用一次, 暂停采样时调用的函数或 None)；
+    无可用 GPU 监控时返回 None。
+    """
+    # ── 第一优先：NVML（进程内直接调用驱动，无需每次启动 nvidia-smi 子进程）──
+    h = _init_nvml() if HAS_PYNVML else None
+    if h is not None:
+        print(f'[GPU监控] 检测到 NVIDIA GPU: {_gpu_cache["name"]}（使用 NVML）', flush=True)
+
+        def sample_nvml():
+            _gpu_cache['util'] = pynvml.nvmlDeviceGetUtilizationRates(h).gpu
+            _gpu_cache['mem_used'] = pynvml.nvmlDeviceGetMemoryInfo(h).used // (1024 * 1024)
+            _gpu_cache['temperature'] = pynvml.nvmlDeviceGetTemperature(h, pynvml.NVML_TEMPERATURE_GPU)
+        return sample_nvml, 1, None
+
+    # ── 第二优先：nvidia-smi（未安装 nvidia-ml-py 时）──
     use_nvidia = False
     try:
         test = _subprocess.run(
-            ['nvidia-smi', '--query-gpu=name', '--format=csv,noheader,nounits'],
+            ['nvidia-smi', '--query-gpu=name,memory.total,persistence_mode',
+             '--format=csv,noheader,nounits'],
             capture_output=True, text=True, timeout=5, creationflags=_CF)
         if test.returncode == 0 and test.stdout.strip():
-            _gpu_cache['name'] = test.stdout.strip().split('\n')[0]
+            # 名称和显存总量运行期间不变，只在初始化时查询一次（名称可能含逗号，从右侧拆分）
+            parts = test.stdout.strip().split('\n')[0].rsplit(', ', 2)
+            name = parts[0]
+            total = parts[1].strip() if len(parts) > 1 else ''
+            persistence = parts[2].strip() if len(parts) > 2 else ''
+            _gpu_cache['name'] = name
+            if total.isdigit():
+                _gpu_cache['mem_total'] = int(total)
             _gpu_cache['available'] = True
             use_nvidia = True
             print(f'[GPU监控] 检测到 NVIDIA GPU: {_gpu_cache["name"]}（使用 nvidia-smi）', flush=True)
+            if persistence == 'Disabled':
+                # Linux 下未开启持久模式时，每次调用 nvidia-smi 都要重新初始化驱动
+                print('[GPU监控] 提示：GPU 持久模式未开启，可执行 nvidia-smi -pm 1 以加快查询', flush=True)
     except FileNotFoundError:
         pass
     except Exception as e:
         print(f'[GPU监控] nvidia-smi 检测失败: {e}', flush=True)
 
     if use_nvidia:
-        while True:
-            try:
-                r = _subprocess.run(
-                    ['nvidia-smi',
-                     '--query-gpu=utilization.gpu,memory.used,memory.total,temperature.gpu',
-                     '--format=csv,noheader,nounits'],
-                    capture_output=True, text=True, timeout=5, creationflags=_CF)
-                if r.returncode == 0:
-                    parts = r.stdout.strip().split('\n')[0].split(', ')
-                    if len(parts) >= 4:
-                        _gpu_cache['util'] = int(parts[0].strip())
-                        _gpu_cache['mem_used'] = int(parts[1].strip())
-                        _gpu_cache['mem_total'] = int(parts[2].strip())
-                        _gpu_cache['temperature'] = int(parts[3].strip())
-            except Exception:
-                pass
-            time.sleep(3)
-        return  # 不会执行到这里
+        # nvidia-smi 循环模式（-lms）：常驻一个进程按间隔输出一行，由读取线程解析，
+        # 不再每次采样都启动子进程、初始化驱动；采样函数只负责进程退出后重启
+        stream = [None]
+
+        def start_stream():
+            proc = _subprocess.Popen(
+                ['nvidia-smi',
+                 '--query-gpu=utilization.gpu,memory.used,temperature.gpu',
+                 '--format=csv,noheader,nounits', '-lms', '3000'],
+                stdout=_subprocess.PIPE, stderr=_subprocess.DEVNULL,
+                text=True, creationflags=_CF)
+            stream[0] = proc
+            threading.Thread(target=_read_nvsmi_stream, args=(proc,), daemon=True).start()
+
+        def ensure_stream():
+            if stream[0] is None or stream[0].poll() is not None:
+                start_stream()
+
+        def stop_stream():
+            # 采样暂停时结束常驻进程，否则它仍每 3 秒查询一次驱动；唤醒后由 ensure_stream 重启
+            proc, stream[0] = stream[0], None
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=2)  # 回收子进程，避免留下僵尸进程
+                except _subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+            # 暂停前的负载已过时：清零，唤醒后首次读取不再报告旧值，直到新进程输出首行
+            _gpu_cache['util'] = 0
+            _gpu_cache['mem_used'] = 0
+            _gpu_cache['temperature'] = 0
+
+        import atexit
+        atexit.register(stop_stream)
+        return ensure_stream, 5, stop_stream  # 每 10 秒检查一次进程是否存活
 
-    # ── 第二优先：Windows PDH 计数器（Intel / AMD / 集成显卡）──
+    # ── 第三优先：Windows PDH 计数器（Intel / AMD / 集成显卡）──
     if os.name != 'nt':
         print('[GPU监控] 非 Windows 系统且无 nvidia-smi，GPU 监控已禁用', flush=True)
-        return
+        return None
 
     gpu_name, gpu_vram = _detect_gpu_name_and_vram()
     if not gpu_name:
         print('[GPU监控] 未检测到 GPU，GPU 监控已禁用', flush=True)
-        return
+        return None
 
+    native = _open_pdh_query()
+    if native:
+        pdh, counters = native
+        _gpu_cache['name'] = gpu_name
+        _gpu_cache['mem_total'] = gpu_vram
+        _gpu_cache['available'] = True
+        print(f'[GPU监控] 检测到 {gpu_name}（{gpu_vram} MB），使用 PDH 原生查询', flush=True)
+        return (lambda: _store_pdh_sample(*_sample_pdh_native(pdh, counters))), 2, None
+
+    # ── 原生查询不可用时回退 typeperf 子进程 ──
     has_pdh = _discover_pdh_counters()
     if not has_pdh:
         print(f'[GPU监控] 检测到 {gpu_name}，但无法读取 GPU 性能计数器', flush=True)
         _gpu_cache['name'] = gpu_name
         _gpu_cache['mem_total'] = gpu_vram
         _gpu_cache['available'] = True
-        return
+        return None
 
     # 初始化通配符计数器文件（自动匹配所有当前及新增进程的 GPU 引擎）
     cf_path = _init_pdh_counter_file()
@@ -381,29 +649,131 @@ def _gpu_sampler_loop_inner():
     print(f'[GPU监控] 检测到 {gpu_name}（{gpu_vram} MB），使用 Windows PDH 通配符计数器', flush=True)
     print(f'[GPU监控] 计数器文件: {cf_path}', flush=True)
     print(f'[GPU监控] 采用通配符模式，自动追踪所有进程的 GPU 引擎使用率', flush=True)
+    return (lambda: _store_pdh_sample(*_sample_pdh_counters())), 3, None  # typeperf 较慢，间隔稍长
+
+
+def _read_nvsmi_stream(proc):
+    """逐行读取 nvidia-smi 循环模式的输出并更新 _gpu_cache，进程退出时结束"""
+    try:
+        for line in proc.stdout:
+            if proc.poll() is not None:
+                break  # 进程已被结束：管道中残留的旧数据不再写入缓存
+            parts = line.strip().split(', ')
+            if len(parts) >= 3:
+                try:
+                    _gpu_cache['util'] = int(parts[0])
+                    _gpu_cache['mem_used'] = int(parts[1])
+                    _gpu_cache['temperature'] = int(parts[2])
+                except ValueError:
+                    pass  # [N/A] 等非数值字段
+    except Exception:
+        pass
+
+
+def _store_pdh_sample(util, mem_used):
+    _gpu_cache['util'] = util
+    _gpu_cache['mem_used'] = mem_used
+    # 核显共享内存可能超过 WMI 报告的 dedicated VRAM，动态校正上限
+    if mem_used > _gpu_cache['mem_total']:
+        _gpu_cache['mem_total'] = mem_used
 
+
+# 采样周期（秒）：CPU 每周期一次，GPU 按 _init_gpu_sampler 返回的倍数
+_METRICS_INTERVAL = 2
+# 超过该时长无人读取资源数据（页面关闭 / 后台标签页停止轮询）时暂停采样，
+# 下次读取时通过 _metrics_wake 唤醒
+_METRICS_IDLE_AFTER = 15
+_metrics_last_wanted = time.monotonic()
+_metrics_wake = threading.Event()
+
+
+def _mark_metrics_wanted():
+    """
+    记录资源数据被读取；采样线程已暂停时将其唤醒。
+    暂停期间缓存可能已过时数分钟甚至数小时，唤醒时同步采样一次 CPU / 内存 / 磁盘，
+    本次读取（如提取前的资源检查）拿到的就是当前值。
+    """
+    global _metrics_last_wanted
+    now = time.monotonic()
+    idle = now - _metrics_last_wanted > _METRICS_IDLE_AFTER
+    _metrics_last_wanted = now
+    if idle:
+        if HAS_PSUTIL:
+            _sample_cpu()
+        _metrics_wake.set()
+
+
+def _metrics_sampler_loop():
+    """
+    CPU / 内存 / 磁盘与 GPU 共用一个后台采样线程：每个周期只唤醒一次，
+    避免两个线程各自定时唤醒、子进程采样相互重叠。
+    """
+    if HAS_PSUTIL:
+        psutil.cpu_percent(interval=None)  # 建立 CPU 基准，下一周期起返回有效值
+    try:
+        gpu = _init_gpu_sampler()
+    except Exception:
+        print(f'[GPU监控] 初始化异常:\n{traceback.format_exc()}', flush=True)
+        gpu = None
+    if not HAS_PSUTIL and gpu is None:
+        return
+    tick = 0
     while True:
-        try:
-            util, mem_used = _sample_pdh_counters()
-            _gpu_cache['util'] = util
-            _gpu_cache['mem_used'] = mem_used
-            # 核显共享内存可能超过 WMI 报告的 dedicated VRAM，动态校正上限
-            if mem_used > _gpu_cache['mem_total']:
-                _gpu_cache['mem_total'] = mem_used
-        except Exception:
-            pass
-        time.sleep(5)  # PDH 采样较慢，间隔稍长
+        if time.monotonic() - _metrics_last_wanted > _METRICS_IDLE_AFTER:
+            if gpu is not None and gpu[2] is not None:
+                try:
+                    gpu[2]()
+                except Exception:
+                    pass
+            _metrics_wake.wait()
+            _metrics_wake.clear()
+            tick = 0  # 唤醒后立即采样 GPU（nvidia-smi 常驻进程随之重启）
+        if HAS_PSUTIL:
+            _sample_cpu()
+        if gpu is not None and tick % gpu[1] == 0:
+            try:
+                gpu[0]()
+            except Exception:
+                pass
+        tick += 1
+        time.sleep(_METRICS_INTERVAL)
+
 
+_metrics_sampler_thread = threading.Thread(target=_metrics_sampler_loop, daemon=True)
+_metrics_sampler_thread.start()
 
-_gpu_sampler_thread = threading.Thread(target=_gpu_sampler_loop, daemon=True)
-_gpu_sampler_thread.start()
 
+_SESSION_EXCLUDE_KEYS = frozenset({'lock', 'event_queues', 'state_snapshot', 'cancel_event',
+                                   'img_list_cache', 'counted_running', 'deleted'})
 
-_SESSION_EXCLUDE_KEYS = frozenset({'lock', 'event_queues'})
+
+def _adjust_running_count(delta):
+    global _running_count
+    with _running_count_lock:
+        _running_count += delta
+
+
+def _publish_state(sess):
+    """重建会话的只读状态快照（调用方须持有 sess['lock']）。
+    快照发布后不再修改，整体替换引用（CPython 下赋值是原子的），
+    读取方（进度轮询 / SSE 初始化 / 状态汇总）无需加锁、无需逐项拷贝。
+    注意：last_active 高频更新不触发重建，快照中的值可能滞后，服务端以 sess 本体为准。
+    """
+    sess['state_snapshot'] = {k: v for k, v in sess.items() if k not in _SESSION_EXCLUDE_KEYS}
+    # 维护全局 running 计数：counted_running 记录本会话是否已计入，保证增减成对
+    running = sess['status'] == 'running' and not sess.get('deleted')
+    if running != sess.get('counted_running', False):
+        sess['counted_running'] = running
+        _adjust_running_count(1 if running else -1)
+    # cancel_flag 同步到 Event，提取线程逐帧检查时无需加锁
+    if sess['cancel_flag']:
+        sess['cancel_event'].set()
+    else:
+        sess['cancel_event'].clear()
 
 
 def _create_session():
-    sid = uuid.uuid4().hex[:8]
+    sid = os.urandom(4).hex()  # 8 位十六进制，同样来自系统 CSPRNG，免去构造 UUID 对象
     cache_dir = os.path.join(SESSIONS_ROOT, sid, 'cache')
     pkg_dir = os.path.join(SESSIONS_ROOT, sid, 'packages')
     os.makedirs(cache_dir, exist_ok=True)
@@ -434,24 +804,29 @@ def _create_session():
         'pkg_dir': pkg_dir,
         # ── 同步原语 ──
         'lock': threading.Lock(),
-        'event_queues': [],   # SSE 事件队列列表
+        'cancel_event': threading.Event(),  # cancel_flag 的无锁镜像
+        'event_queues': set(),   # SSE 事件队列集合（增删 O(1)）
     }
+    _publish_state(session)
     with _sessions_lock:
         _sessions[sid] = session
+    _invalidate_system_status()
+    _watcher_wake.set()  # 新会话尚无 SSE 连接，让巡检线程切回短周期
     return sid
 
 
 def _get_session(sid):
-    with _sessions_lock:
-        return _sessions.get(sid)
+    # dict.get 在 GIL 下是原子操作；_sessions_lock 只用于保护"检查数量 + 插入"
+    # 等复合操作，单次查找无需加锁（SSE / 进度轮询 / 每次进度回调都会走这里）
+    return _sessions.get(sid)
 
 
 def _get_session_state(sid):
+    """返回会话的只读状态快照（无锁读取，调用方不得修改返回的 dict）"""
     sess = _get_session(sid)
     if not sess:
         return None
-    with sess['lock']:
-        return {k: v for k, v in sess.items() if k not in _SESSION_EXCLUDE_KEYS}
+    return sess['state_snapshot']
 
 
 def _update_session(sid, **kw):
@@ -460,6 +835,9 @@ def _update_session(sid, **kw):
         return
     with sess['lock']:
         sess.update(kw)
+        _publish_state(sess)
+    if 'status' in kw or 'cancel_flag' in kw:
+        _invalidate_system_status()
 
 
 # ── 会话元数据持久化（用于断线恢复 & 断点续传）──
@@ -471,23 +849,89 @@ _META_SAVE_KEYS = (
 )
 
 
+# 串行化所有 session.json 写入：取快照 → 写临时文件 → replace 整体在锁内完成，
+# 保证后取的快照总是后落盘，旧状态不会覆盖新状态
+_meta_write_lock = threading.Lock()
+
+
 def _save_session_meta(sid):
     """将会话关键信息写入磁盘 session.json，用于重启后恢复"""
     sess = _get_session(sid)
     if not sess:
         return
-    meta = {}
-    with sess['lock']:
-        for k in _META_SAVE_KEYS:
-            if k in sess:
-                meta[k] = sess[k]
-    meta['updated_at'] = time.time()
-    meta_file = os.path.join(SESSIONS_ROOT, sid, 'session.json')
-    try:
-        with open(meta_file, 'w', encoding='utf-8') as f:
-            json.dump(meta, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f'[元数据] 保存失败 {sid}: {e}')
+    meta_dir = os.path.join(SESSIONS_ROOT, sid)
+    with _meta_write_lock:
+        meta = {}
+        with sess['lock']:
+            for k in _META_SAVE_KEYS:
+                if k in sess:
+                    meta[k] = sess[k]
+        meta['updated_at'] = time.time()
+        tmp_file = None
+        try:
+            # 先写临时文件再 os.replace 原子替换：写入中途崩溃 / 断电不会留下半截 JSON，
+            # 否则下次启动读取失败，断点续传信息全部丢失。临时文件名唯一，不与其他写入共用
+            fd, tmp_file = tempfile.mkstemp(prefix='session.', suffix='.tmp', dir=meta_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_bytes(meta))  # 仅供程序读取，不缩进
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, os.path.join(meta_dir, 'session.json'))
+        except Exception as e:
+            print(f'[元数据] 保存失败 {sid}: {e}')
+            if tmp_file is not None:
+                _safe_unlink(tmp_file)
+
+
+# ── 元数据后台写入：提取线程只标记脏会话，落盘（含 fsync）由单独线程完成 ──
+# 同一会话多次标记会合并为一次写入，写入时读取的是会话的最新状态
+_meta_dirty = set()
+_meta_cv = threading.Condition()
+_meta_stop = False
+_META_STOP_TIMEOUT = 10  # 退出时最多等待后台写入线程这么久
+
+
+def _mark_session_meta_dirty(sid):
+    with _meta_cv:
+        _meta_dirty.add(sid)
+        _meta_cv.notify()
+
+
+def _flush_session_meta():
+    """
+    退出前调用：通知后台写入线程写完剩余元数据后退出并等待它结束，
+    不在调用方线程另起一路并发写入；正在进行的写入也会完整落盘。
+    """
+    global _meta_stop
+    with _meta_cv:
+        _meta_stop = True
+        _meta_cv.notify()
+    if _meta_writer_thread.is_alive() and _meta_writer_thread is not threading.current_thread():
+        _meta_writer_thread.join(_META_STOP_TIMEOUT)
+    if not _meta_writer_thread.is_alive():
+        # 写入线程已结束（或此前已停止）后仍被标记的会话，在这里补写
+        with _meta_cv:
+            sids = tuple(_meta_dirty)
+            _meta_dirty.clear()
+        for sid in sids:
+            _save_session_meta(sid)
+
+
+def _meta_writer_loop():
+    while True:
+        with _meta_cv:
+            while not _meta_dirty and not _meta_stop:
+                _meta_cv.wait()
+            if not _meta_dirty:
+                return  # 收到停止信号且已无待写入
+            sids = tuple(_meta_dirty)
+            _meta_dirty.clear()
+        for sid in sids:
+            _save_session_meta(sid)
+
+
+_meta_writer_thread = threading.Thread(target=_meta_writer_loop, name='meta_writer', daemon=True)
+_meta_writer_thread.start()
 
 
 def _load_session_meta(sess_dir):
@@ -496,8 +940,8 @@ def _load_session_meta(sess_dir):
     if not os.path.exists(meta_file):
         return {}
     try:
-        with open(meta_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(meta_file, 'rb') as f:
+            return json_loads(f.read())
     except Exception:
         return {}
 
@@ -507,18 +951,23 @@ def _recover_sessions_from_disk():
     if not os.path.exists(SESSIONS_ROOT):
         return 0
     recovered = 0
-    for name in os.listdir(SESSIONS_ROOT):
-        sess_dir = os.path.join(SESSIONS_ROOT, name)
-        if not os.path.isdir(sess_dir):
-            continue
+    # os.scandir 的 DirEntry 自带文件类型，省去逐项 isdir / exists 的 stat 调用
+    with os.scandir(SESSIONS_ROOT) as root_it:
+        entries = [e for e in root_it if e.is_dir()]
+    for entry in entries:
+        name = entry.name
+        sess_dir = entry.path
         cache_dir = os.path.join(sess_dir, 'cache')
         pkg_dir = os.path.join(sess_dir, 'packages')
 
         # 统计磁盘上的实际图片数
         image_count = 0
-        if os.path.exists(cache_dir):
-            image_count = len([f for f in os.listdir(cache_dir)
-                               if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
+        try:
+            with os.scandir(cache_dir) as it:
+                image_count = sum(1 for f in it
+                                  if _is_img_name(f.name) and f.is_file())
+        except OSError:
+            pass  # 无 cache 目录
 
         meta = _load_session_meta(sess_dir)
 
@@ -565,7 +1014,8 @@ def _recover_sessions_from_disk():
             'cache_dir': cache_dir,
             'pkg_dir': pkg_dir,
             'lock': threading.Lock(),
-            'event_queues': [],
+            'cancel_event': threading.Event(),
+            'event_queues': set(),
             # 断点续传所需的额外字段
             'last_frame_index': meta.get('last_frame_index', 0),
             'total_frames': meta.get('total_frames', 0),
@@ -577,6 +1027,7 @@ def _recover_sessions_from_disk():
             'use_gpu': meta.get('use_gpu', True),
             'speed_mode': meta.get('speed_mode', 'fast'),
         }
+        _publish_state(session)
         with _sessions_lock:
             _sessions[sid] = session
         recovered += 1
@@ -584,74 +1035,202 @@ def _recover_sessions_from_disk():
     return recovered
 
 
+_CLEAR_DIR_WORKERS = 4
+_CLEAR_DIR_PARALLEL_MIN = 64  # 文件数较少时线程池开销大于收益，直接串行删除
+
+
+def _clear_dir(path):
+    """
+    清空目录内容但保留目录本身（免去 rmtree + makedirs 往返）。
+    文件较多时并行 unlink：NTFS 上单次删除约 100 µs，主要耗在系统调用等待上。
+    """
+    os.makedirs(path, exist_ok=True)
+    files = []
+    with os.scandir(path) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                shutil.rmtree(e.path)
+            else:
+                files.append(e.path)
+    if len(files) < _CLEAR_DIR_PARALLEL_MIN:
+        for f in files:
+            os.unlink(f)
+    else:
+        with ThreadPoolExecutor(max_workers=_CLEAR_DIR_WORKERS) as ex:
+            list(ex.map(os.unlink, files))
+
+
+_TRASH_MARK = '.old.'
+
+
+def _remove_trash_dirs(parent, prefix):
+    """删除 parent 下所有以 prefix 开头的待删目录（含上次退出时未删完的）"""
+    try:
+        with os.scandir(parent) as it:
+            stale = [e.path for e in it
+                     if e.name.startswith(prefix) and e.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return
+    for d in stale:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _reset_dir(path):
+    """
+    清空目录：先整体改名为同级的 <name>.old.<随机> 再新建空目录，
+    逐个删除旧文件交给后台线程，请求线程只付出一次 rename 的代价。
+    改名失败（如 Windows 上有文件仍被打开）时回退为就地清空。
+    """
+    parent, name = os.path.split(os.path.normpath(path))
+    prefix = name + _TRASH_MARK
+    try:
+        os.rename(path, os.path.join(parent, prefix + os.urandom(4).hex()))
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+        return
+    except OSError:
+        _clear_dir(path)
+        return
+    os.makedirs(path, exist_ok=True)
+    threading.Thread(target=_remove_trash_dirs, args=(parent, prefix),
+                     name='dir_trash', daemon=True).start()
+
+
 def _delete_session(sid):
     with _sessions_lock:
         sess = _sessions.pop(sid, None)
     if sess:
-        # 关闭所有 SSE 连接
+        _invalidate_system_status()
+        # 通知仍在运行的提取线程退出（_publish_state 同步 cancel_event 并扣减 running 计数）
         with sess['lock']:
-            for eq in sess.get('event_queues', []):
+            sess['deleted'] = True
+            sess['cancel_flag'] = True
+            _publish_state(sess)
+            # 关闭所有 SSE 连接
+            for eq in sess.get('event_queues', ()):
                 try:
                     eq.put_nowait({'type': 'close'})
                 except queue.Full:
                     pass
             sess['event_queues'].clear()
+        _jpeg_cache_drop_session(sid)
         session_dir = os.path.join(SESSIONS_ROOT, sid)
         if os.path.exists(session_dir):
             shutil.rmtree(session_dir, ignore_errors=True)
 
 
+# 会话汇总（/api/sessions、系统状态）返回的字段
+_SUMMARY_KEYS = ('id', 'status', 'progress', 'message', 'saved_count', 'video_path',
+                 'video_name', 'eta_seconds', 'elapsed_seconds')
+_SUMMARY_GET = itemgetter(*_SUMMARY_KEYS)  # 一次 C 层调用取出全部汇总字段
+
+
 def _get_all_sessions_summary():
+    # 直接遍历会话对象读取已发布的只读快照：不按 sid 二次查表，也不加会话锁
     with _sessions_lock:
-        sids = list(_sessions.keys())
+        sessions = list(_sessions.values())
     result = []
-    for sid in sids:
-        state = _get_session_state(sid)
-        if state:
-            summary = {
-                'id': state['id'],
-                'status': state['status'],
-                'progress': state['progress'],
-                'message': state['message'],
-                'saved_count': state['saved_count'],
-                'video_path': state['video_path'],
-                'video_name': state['video_name'],
-                'eta_seconds': state['eta_seconds'],
-                'elapsed_seconds': state['elapsed_seconds'],
-                'pkg_status': state.get('pkg_status', 'idle'),
-                'pkg_progress': state.get('pkg_progress', 0),
-            }
-            # 断点续传信息
-            if state['status'] == 'interrupted':
-                summary['last_frame_index'] = state.get('last_frame_index', 0)
-                summary['total_frames'] = state.get('total_frames', 0)
-            result.append(summary)
+    for sess in sessions:
+        state = sess['state_snapshot']
+        summary = dict(zip(_SUMMARY_KEYS, _SUMMARY_GET(state)))
+        summary['pkg_status'] = state.get('pkg_status', 'idle')
+        summary['pkg_progress'] = state.get('pkg_progress', 0)
+        # 断点续传信息
+        if state['status'] == 'interrupted':
+            summary['last_frame_index'] = state.get('last_frame_index', 0)
+            summary['total_frames'] = state.get('total_frames', 0)
+        result.append(summary)
     return result
 
 
 def _count_running():
-    with _sessions_lock:
-        sids = list(_sessions.keys())
-    count = 0
-    for sid in sids:
-        sess = _get_session(sid)
-        if sess:
-            with sess['lock']:
-                if sess['status'] == 'running':
-                    count += 1
-    return count
+    return _running_count
+
+
+# ============================================================
+#  已提取图片的内存缓存（提取线程编码后直接放入，画廊首次加载免读盘）
+# ============================================================
+_JPEG_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_jpeg_cache = OrderedDict()   # (sid, filename) -> (bytes, etag)，按最近使用排序
+_jpeg_cache_bytes = 0
+_jpeg_cache_lock = threading.Lock()
+
+
+def _jpeg_cache_put(sid, filename, data):
+    global _jpeg_cache_bytes
+    key = (sid, filename)
+    etag = f'{len(data):x}-{zlib.crc32(data):08x}'
+    with _jpeg_cache_lock:
+        old = _jpeg_cache.pop(key, None)
+        if old is not None:
+            _jpeg_cache_bytes -= len(old[0])
+        _jpeg_cache[key] = (data, etag)
+        _jpeg_cache_bytes += len(data)
+        # 超出上限时淘汰最久未使用的图片
+        while _jpeg_cache_bytes > _JPEG_CACHE_MAX_BYTES and _jpeg_cache:
+            _, (old_data, _) = _jpeg_cache.popitem(last=False)
+            _jpeg_cache_bytes -= len(old_data)
+
+
+def _jpeg_cache_get(sid, filename):
+    key = (sid, filename)
+    with _jpeg_cache_lock:
+        entry = _jpeg_cache.get(key)
+        if entry is not None:
+            _jpeg_cache.move_to_end(key)
+        return entry
+
+
+def _jpeg_cache_drop_session(sid):
+    """会话图片目录被清空 / 删除时同步丢弃其缓存"""
+    global _jpeg_cache_bytes
+    with _jpeg_cache_lock:
+        for key in [k for k in _jpeg_cache if k[0] == sid]:
+            data, _ = _jpeg_cache.pop(key)
+            _jpeg_cache_bytes -= len(data)
 
 
 # ============================================================
 #  SSE 事件推送
 # ============================================================
+class _SSEQueue(queue.Queue):
+    """
+    SSE 订阅队列：离散事件（开始 / 完成 / 出错）按 FIFO 排队；
+    进度事件（status == 'running'）只在 latest 中按类型保留最新一条，
+    队列里放一个类型名作为占位，生成器取到占位时再读取最新进度。
+    进度高频刷新时不会挤占队列，也不会推送过时的进度。
+    latest 的读写均在 sess['lock'] 内进行。
+    """
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self.latest = {}
+
+
+def _push_running_event_locked(sess, event_data):
+    """合并推送 running 进度事件（调用方须持有 sess['lock']）"""
+    key = event_data.get('type')
+    for eq in sess.get('event_queues', ()):
+        pending = key in eq.latest
+        eq.latest[key] = event_data
+        if not pending:
+            try:
+                eq.put_nowait(key)
+            except queue.Full:
+                del eq.latest[key]  # 占位未入队，下次进度重新排队
+
+
 def _push_event(sid, event_data):
     """向某个会话的所有 SSE 客户端推送事件"""
     sess = _get_session(sid)
     if not sess:
         return
+    if event_data.get('status') == 'running':
+        with sess['lock']:
+            _push_running_event_locked(sess, event_data)
+        return
     with sess['lock']:
-        queues = sess.get('event_queues', [])[:]
+        queues = tuple(sess.get('event_queues', ()))
     for eq in queues:
         try:
             eq.put_nowait(event_data)
@@ -663,6 +1242,12 @@ def _push_event(sid, event_data):
 _last_heartbeat = 0.0
 _heartbeat_received = False
 HEARTBEAT_TIMEOUT = 300  # 5 分钟：浏览器后台标签页会大幅节流 setInterval
+# 巡检线程：存在无 SSE 连接的会话时 5 秒一轮；否则只剩心跳超时要检查，
+# 直接睡到心跳截止时间（至少 30 秒），心跳正常时几乎不唤醒。
+# 新建会话 / SSE 断开时通过 _watcher_wake 唤醒，立即切回短周期
+_WATCHER_POLL = 5
+_WATCHER_IDLE_POLL = 30
+_watcher_wake = threading.Event()
 
 
 # ============================================================
@@ -701,7 +1286,7 @@ def _cleanup_orphan_sessions():
         if not sess:
             continue
         with sess['lock']:
-            has_sse = len(sess.get('event_queues', [])) > 0
+            has_sse = len(sess.get('event_queues', ())) > 0
             is_running = sess['status'] == 'running'
             is_packaging = sess.get('pkg_status') == 'running'
             has_results = sess.get('saved_count', 0) > 0
@@ -717,6 +1302,7 @@ def _cleanup_orphan_sessions():
             if age > ORPHAN_SESSION_TIMEOUT:
                 with sess['lock']:
                     sess['cancel_flag'] = True
+                    _publish_state(sess)
                 orphans.append(sid)
         else:
             # interrupted 或有成果的会话给更长的宽限期（5 分钟），等待前端重连
@@ -771,11 +1357,12 @@ def close_session(sid):
         is_packaging = sess.get('pkg_status') == 'running'
         if is_running:
             sess['cancel_flag'] = True
+            _publish_state(sess)
     # 如果有任务正在执行，不立即删除（让任务自然结束后由孤儿清理回收）
     # 只断开 SSE 连接，让后台孤儿清理线程在任务完成后处理
     if is_running or is_packaging:
         with sess['lock']:
-            for eq in sess.get('event_queues', []):
+            for eq in sess.get('event_queues', ()):
                 try:
                     eq.put_nowait({'type': 'close'})
                 except queue.Full:
@@ -796,17 +1383,19 @@ def session_events(sid):
     if not sess:
         return jsonify(success=False, message='会话不存在'), 404
 
-    event_q = queue.Queue(maxsize=200)
+    event_q = _SSEQueue(maxsize=200)
 
     with sess['lock']:
-        sess['event_queues'].append(event_q)
+        sess['event_queues'].add(event_q)
         sess['last_active'] = time.time()  # SSE 连接时更新活跃时间
 
     def _cleanup():
         try:
             with sess['lock']:
-                if event_q in sess['event_queues']:
-                    sess['event_queues'].remove(event_q)
+                sess['event_queues'].discard(event_q)
+                detached = not sess['event_queues']
+            if detached:
+                _watcher_wake.set()
         except Exception:
             pass
 
@@ -815,25 +1404,43 @@ def session_events(sid):
             # 推送当前状态（用于 SSE 重连恢复）
             state = _get_session_state(sid)
             if state:
-                yield f"data: {json.dumps({'type': 'init', 'state': state}, ensure_ascii=False)}\n\n"
+                yield sse_data({'type': 'init', 'state': state})
 
             while True:
                 try:
                     event = event_q.get(timeout=15)
-                    if event.get('type') == 'close':
-                        break
-                    # 每次推送事件时更新会话活跃时间
-                    try:
-                        with sess['lock']:
-                            sess['last_active'] = time.time()
-                    except Exception:
-                        pass
-                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
                 except queue.Empty:
                     # 心跳保持连接
-                    yield ": keepalive\n\n"
+                    yield b': keepalive\n\n'
                     if not _get_session(sid):
                         break
+                    continue
+                # 顺带取出已积压的事件，拼成一次写出（前端仍按独立 SSE 帧解析）
+                frames = []
+                closing = False
+                while True:
+                    if isinstance(event, str):
+                        # 进度占位：取出该类型的最新进度
+                        with sess['lock']:
+                            event = event_q.latest.pop(event, None)
+                    if event is not None:
+                        if event.get('type') == 'close':
+                            closing = True
+                            break
+                        frames.append(sse_data(event))
+                        if len(frames) >= SSE_MAX_BATCH:
+                            break
+                    try:
+                        event = event_q.get_nowait()
+                    except queue.Empty:
+                        break
+                if frames:
+                    # 每次推送事件时更新会话活跃时间：单个 float 的 dict 赋值在 GIL 下是原子的，
+                    # 孤儿清理只读取它，无需与提取状态字段争用 sess['lock']
+                    sess['last_active'] = time.time()
+                    yield b''.join(frames)
+                if closing:
+                    break
         except GeneratorExit:
             pass
         finally:
@@ -870,55 +1477,79 @@ def _ensure_dpi_aware():
             pass
 
 
-def _open_file_dialog(mode='single'):
-    """
-    打开 tkinter 文件对话框。
-    mode: 'single' | 'multi' | 'folder'
-    返回: str (single), list[str] (multi), str (folder)
-    """
+# tkinter 对话框线程：常驻一个隐藏的 Tk 根窗口，后续弹窗直接复用，
+# 省去每次 Tk() 初始化（Windows 上约 100–300ms）。Tk 对象只能在创建它的线程中使用，
+# 所以所有弹窗请求都通过队列交给这一个线程执行。
+_tk_request_queue = None
+_tk_thread_lock = threading.Lock()
+
+
+def _tk_dialog_loop(req_q):
     import tkinter as tk
     from tkinter import filedialog
-    import queue as stdlib_queue
 
     _ensure_dpi_aware()
-    result_queue = stdlib_queue.Queue()
-
-    def _pick():
+    root = None
+    while True:
+        mode, result_queue = req_q.get()
         try:
-            root = tk.Tk()
-            root.title('影幻智提 (VidSlide)')
-            root.withdraw()
+            if root is None:
+                root = tk.Tk()
+                root.title('影幻智提 (VidSlide)')
+                root.withdraw()
             root.wm_attributes('-topmost', 1)
             root.focus_force()
             if mode == 'multi':
                 paths = filedialog.askopenfilenames(
+                    parent=root,
                     title="请选择要批量处理的视频文件（可多选）",
                     filetypes=_VIDEO_FILETYPES,
                 )
-                root.destroy()
                 result_queue.put(list(paths) if paths else [])
             elif mode == 'folder':
                 folder = filedialog.askdirectory(
+                    parent=root,
                     title="请选择包含视频文件的文件夹",
                 )
-                root.destroy()
                 result_queue.put(folder or '')
             else:
                 path = filedialog.askopenfilename(
+                    parent=root,
                     title="请选择要提取的课程视频",
                     filetypes=_VIDEO_FILETYPES,
                 )
-                root.destroy()
                 result_queue.put(path or '')
         except Exception as e:
             print(f'[DEBUG] tkinter 弹窗异常: {e}')
+            # 根窗口可能已损坏，下次重建
+            if root is not None:
+                try:
+                    root.destroy()
+                except Exception:
+                    pass
+                root = None
             result_queue.put([] if mode == 'multi' else '')
 
-    t = threading.Thread(target=_pick, daemon=True)
-    t.start()
-    t.join(timeout=120)
 
-    return result_queue.get_nowait() if not result_queue.empty() else ([] if mode == 'multi' else '')
+def _open_file_dialog(mode='single'):
+    """
+    打开 tkinter 文件对话框（由常驻对话框线程执行）。
+    mode: 'single' | 'multi' | 'folder'
+    返回: str (single), list[str] (multi), str (folder)
+    """
+    global _tk_request_queue
+    with _tk_thread_lock:
+        if _tk_request_queue is None:
+            _tk_request_queue = queue.Queue()
+            threading.Thread(target=_tk_dialog_loop, args=(_tk_request_queue,),
+                             daemon=True).start()
+
+    result_queue = queue.Queue()
+    _tk_request_queue.put((mode, result_queue))
+    try:
+        return result_queue.get(timeout=120)
+    except queue.Empty:
+        return [] if mode == 'multi' else ''
 
 
 # ============================================================
@@ -1028,43 +1659,60 @@ def start_extraction(sid):
                        hint='请检查文件是否已被移动或删除，然后重新选择视频。')
 
     # ── 视频文件预检测 ──
-    try:
-        _test_cap = cv2.VideoCapture(video_path)
-        if not _test_cap.isOpened():
-            _test_cap.release()
-            return jsonify(success=False,
-                           message='无法打开视频文件，可能文件已损坏或格式不支持。',
-                           hint='建议：1) 检查文件是否完整下载；2) 尝试用播放器打开验证；'
-                                '3) 如果是 m3u8 格式，请先用猫抓完整下载为 mp4。')
-        _test_ok, _test_frame = _test_cap.read()
-        _fourcc = int(_test_cap.get(cv2.CAP_PROP_FOURCC))
-        _codec = ''.join([chr((_fourcc >> 8 * i) & 0xFF) for i in range(4)]) if _fourcc else 'N/A'
-        _total = int(_test_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        _fps = _test_cap.get(cv2.CAP_PROP_FPS) or 0
-        _test_cap.release()
-        if not _test_ok or _test_frame is None:
-            return jsonify(success=False,
-                           message=f'视频解码失败（编解码器: {_codec}）。',
-                           hint='可能原因：1) 视频编码不被 OpenCV 支持；2) 文件不完整。'
-                                '建议：尝试用 FFmpeg 转码为 mp4 后重试。')
+    # 优先用 PyAV 只读容器头（无需解码首帧）；不可用或失败时回退 OpenCV 解码首帧
+    _meta = probe_video_meta(video_path)
+    if _meta is not None:
+        _codec, _total, _fps = _meta
         if _total < 10 or _fps <= 0:
             return jsonify(success=False,
                            message=f'视频信息异常：帧数={_total}，FPS={_fps:.1f}。',
                            hint='该文件可能不是有效的视频文件，或已严重损坏。')
         print(f'[DEBUG][{sid}] 视频预检通过: codec={_codec}, frames={_total}, fps={_fps:.1f}')
-    except cv2.error as e:
-        return jsonify(success=False,
-                       message=f'OpenCV 视频检测出错: {str(e)}',
-                       hint='可能是视频编码不兼容。建议用 FFmpeg 转码为 H.264 mp4 后重试。')
-    except Exception as e:
-        return jsonify(success=False,
-                       message=f'视频文件预检测失败: {str(e)}',
-                       hint='请确认文件路径正确且文件未被其他程序占用。')
+    else:
+        try:
+            # 与提取线程一致优先 FFmpeg 后端（Windows 默认可能落到 MSMF，打开更慢）；
+            # 只解一帧关键帧，CPU 解码比初始化硬件解码设备更快，因此不请求硬件加速
+            _test_cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+            if not _test_cap.isOpened():
+                _test_cap.release()
+                _test_cap = cv2.VideoCapture(video_path)
+            if not _test_cap.isOpened():
+                _test_cap.release()
+                return jsonify(success=False,
+                               message='无法打开视频文件，可能文件已损坏或格式不支持。',
+                               hint='建议：1) 检查文件是否完整下载；2) 尝试用播放器打开验证；'
+                                    '3) 如果是 m3u8 格式，请先用猫抓完整下载为 mp4。')
+            _test_ok, _test_frame = _test_cap.read()
+            _fourcc = int(_test_cap.get(cv2.CAP_PROP_FOURCC))
+            _codec = struct.pack('<I', _fourcc & 0xFFFFFFFF).decode('ascii', 'replace') if _fourcc else 'N/A'
+            if not _codec.isprintable():
+                # 部分容器的 FOURCC 含控制字节（如 \x00），避免写进提示信息和日志
+                _codec = ''.join(c if c.isprintable() else '?' for c in _codec)
+            _total = int(_test_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            _fps = _test_cap.get(cv2.CAP_PROP_FPS) or 0
+            _test_cap.release()
+            if not _test_ok or _test_frame is None:
+                return jsonify(success=False,
+                               message=f'视频解码失败（编解码器: {_codec}）。',
+                               hint='可能原因：1) 视频编码不被 OpenCV 支持；2) 文件不完整。'
+                                    '建议：尝试用 FFmpeg 转码为 mp4 后重试。')
+            if _total < 10 or _fps <= 0:
+                return jsonify(success=False,
+                               message=f'视频信息异常：帧数={_total}，FPS={_fps:.1f}。',
+                               hint='该文件可能不是有效的视频文件，或已严重损坏。')
+            print(f'[DEBUG][{sid}] 视频预检通过: codec={_codec}, frames={_total}, fps={_fps:.1f}')
+        except cv2.error as e:
+            return jsonify(success=False,
+                           message=f'OpenCV 视频检测出错: {str(e)}',
+                           hint='可能是视频编码不兼容。建议用 FFmpeg 转码为 H.264 mp4 后重试。')
+        except Exception as e:
+            return jsonify(success=False,
+                           message=f'视频文件预检测失败: {str(e)}',
+                           hint='请确认文件路径正确且文件未被其他程序占用。')
 
     cache_dir = sess['cache_dir']
-    if os.path.exists(cache_dir):
-        shutil.rmtree(cache_dir)
-    os.makedirs(cache_dir, exist_ok=True)
+    _jpeg_cache_drop_session(sid)
+    _reset_dir(cache_dir)
 
     video_name = Path(video_path).stem or '未命名视频'
     _update_session(sid,
@@ -1142,17 +1790,15 @@ def _extraction_worker(sid, video_path, cache_dir, threshold, enable_history, ma
     _last_meta_save = [time.time()]  # 用列表以便闭包修改
 
     try:
+        # 会话对象在提取期间不会被替换：只查一次，进度回调直接持有引用
+        _sess = _get_session(sid)
+        _sess_lock = _sess['lock'] if _sess else None
+
         def on_progress(saved_count, progress_pct, message, eta_seconds, elapsed_seconds, current_frame=0):
+            if _sess is None:
+                return
             actual_saved = saved_offset + saved_count
-            _update_session(sid,
-                saved_count=actual_saved,
-                progress=progress_pct,
-                message=message,
-                eta_seconds=eta_seconds,
-                elapsed_seconds=elapsed_seconds,
-                last_frame_index=current_frame,
-            )
-            _push_event(sid, {
+            event = {
                 'type': 'extraction',
                 'status': 'running',
                 'saved_count': actual_saved,
@@ -1160,19 +1806,29 @@ def _extraction_worker(sid, video_path, cache_dir, threshold, enable_history, ma
                 'message': message,
                 'eta_seconds': eta_seconds,
                 'elapsed_seconds': elapsed_seconds,
-            })
+            }
+            # 更新会话字段 + 发布快照 + 推送 SSE 合并在同一次加锁内完成
+            with _sess_lock:
+                _sess['saved_count'] = actual_saved
+                _sess['progress'] = progress_pct
+                _sess['message'] = message
+                _sess['eta_seconds'] = eta_seconds
+                _sess['elapsed_seconds'] = elapsed_seconds
+                _sess['last_frame_index'] = current_frame
+                _publish_state(_sess)
+                _push_running_event_locked(_sess, event)
             # 每 5 秒保存一次元数据到磁盘（断点续传用）
             now = time.time()
             if now - _last_meta_save[0] >= 5:
                 _last_meta_save[0] = now
-                _save_session_meta(sid)
+                _mark_session_meta_dirty(sid)
+
+        # 逐帧取消检查：直接读 Event，不查全局会话表、不加锁
+        # 会话被删除时 _delete_session 会 set 该 Event
+        _cancel_event = _sess['cancel_event'] if _sess else None
 
         def should_cancel():
-            s = _get_session(sid)
-            if not s:
-                return True
-            with s['lock']:
-                return s['cancel_flag']
+            return _cancel_event is None or _cancel_event.is_set()
 
         # 保存提取参数到 session（用于断点续传恢复）
         _update_session(sid,
@@ -1181,13 +1837,14 @@ def _extraction_worker(sid, video_path, cache_dir, threshold, enable_history, ma
             use_gpu=use_gpu, speed_mode=speed_mode, classroom_mode=classroom_mode,
         )
         # 提取开始时立即保存元数据
-        _save_session_meta(sid)
+        _mark_session_meta_dirty(sid)
 
         status, message, saved_count = extract_slides(
             video_path, cache_dir, threshold, enable_history, max_history, use_roi, fast_mode,
             use_gpu=use_gpu, speed_mode=speed_mode, classroom_mode=classroom_mode,
             on_progress=on_progress, should_cancel=should_cancel,
             start_frame=start_frame, saved_offset=saved_offset,
+            on_saved=lambda fn, data: _jpeg_cache_put(sid, fn, data),
         )
 
         actual_saved = saved_offset + saved_count
@@ -1206,7 +1863,7 @@ def _extraction_worker(sid, video_path, cache_dir, threshold, enable_history, ma
             _update_session(sid, status='error', message=message, saved_count=actual_saved)
 
         # 提取结束后保存最终元数据
-        _save_session_meta(sid)
+        _mark_session_meta_dirty(sid)
 
         _push_event(sid, {
             'type': 'extraction',
@@ -1221,7 +1878,7 @@ def _extraction_worker(sid, video_path, cache_dir, threshold, enable_history, ma
         err_msg = str(e) or '未知错误'
         print(f'[后台提取致命错误] SID={sid} \n{_tb.format_exc()}', flush=True)
         _update_session(sid, status='error', message=f'系统异常: {err_msg}', cancel_flag=True)
-        _save_session_meta(sid)
+        _mark_session_meta_dirty(sid)
         _push_event(sid, {
             'type': 'extraction',
             'status': 'error',
@@ -1239,7 +1896,7 @@ def session_progress(sid):
     state = _get_session_state(sid)
     if not state:
         return jsonify(success=False, message='会话不存在'), 404
-    return jsonify(state)
+    return _json_response(state)
 
 
 @app.route('/api/session/<sid>/cancel', methods=['POST'])
@@ -1257,13 +1914,29 @@ def session_list_images(sid):
     if not sess:
         return jsonify(images=[])
     cache_dir = sess['cache_dir']
-    if not os.path.exists(cache_dir):
+    try:
+        mtime_ns = os.stat(cache_dir).st_mtime_ns
+    except FileNotFoundError:
         return jsonify(images=[])
-    imgs = sorted(
-        f for f in os.listdir(cache_dir)
-        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-    )
-    return jsonify(images=imgs)
+    # 前端会反复轮询：目录 mtime 与已保存数量均未变化时直接返回上次的列表
+    key = (mtime_ns, sess.get('saved_count', 0))
+    # 缓存的是序列化后的响应体：新图片到来前只序列化一次
+    cached = sess.get('img_list_cache')
+    if cached is not None and cached[0] == key:
+        return Response(cached[1], mimetype='application/json')
+    # scandir 一次遍历
+    try:
+        with os.scandir(cache_dir) as it:
+            imgs = [e.name for e in it
+                    if _is_img_name(e.name)]
+    except FileNotFoundError:
+        return jsonify(images=[])
+    # slide_NNNN 为零填充命名，字符串排序即时间顺序
+    imgs.sort()
+    body = json_bytes({'images': imgs})
+    with sess['lock']:
+        sess['img_list_cache'] = (key, body)
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/api/session/<sid>/image/<path:filename>')
@@ -1275,8 +1948,19 @@ def session_serve_image(sid, filename):
     safe_name = os.path.basename(filename)
     if not safe_name or safe_name != filename:
         return jsonify(success=False, message='非法文件名'), 400
-    resp = send_from_directory(sess['cache_dir'], safe_name)
-    resp.headers['Cache-Control'] = 'no-store'
+    # 刚提取的图片直接从内存返回
+    cached = _jpeg_cache_get(sid, safe_name)
+    if cached is not None:
+        data, etag = cached
+        resp = Response(data, mimetype='image/jpeg')
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp.make_conditional(request)
+    # no-cache（而非 no-store）：浏览器可缓存但每次需校验，
+    # 同名图片未变化时 send_from_directory 的 ETag / Last-Modified 校验直接返回 304；
+    # 重新提取会改写文件 mtime/大小，ETag 随之变化，不会读到旧图
+    resp = send_from_directory(sess['cache_dir'], safe_name, conditional=True, etag=True)
+    resp.headers['Cache-Control'] = 'no-cache'
     return resp
 
 
@@ -1316,8 +2000,8 @@ def session_package(sid):
     if not paths:
         return jsonify(success=False, message='图片文件不存在')
 
-    with sess['lock']:
-        vname = Path(sess.get('video_path', '') or 'slides').stem or 'slides'
+    # video_name 在开始提取时已由 Path(video_path).stem 算好，无需再次解析路径
+    vname = sess.get('video_name') or 'slides'
 
     _update_session(sid,
         pkg_status='running', pkg_progress=0,
@@ -1334,8 +2018,16 @@ def session_package(sid):
 
 def _package_worker(sid, fmt, paths, pkg_dir, video_name):
     """后台打包线程：调用 exporter 模块 + SSE 推送进度"""
+    lower_thread_priority()
     try:
+        # ZIP/PPTX 每张图片回调一次：百分比未变且距上次推送不足 100 ms 时合并掉
+        _last_push = [-1, 0.0]  # [pct, time]
+
         def on_progress(pct, msg):
+            now = time.time()
+            if pct == _last_push[0] and now - _last_push[1] < 0.1:
+                return
+            _last_push[0], _last_push[1] = pct, now
             _update_session(sid, pkg_progress=pct, pkg_message=msg)
             _push_event(sid, {
                 'type': 'packaging',
@@ -1400,10 +2092,9 @@ def session_cleanup(sid):
     sess = _get_session(sid)
     if not sess:
         return jsonify(success=False, message='会话不存在')
+    _jpeg_cache_drop_session(sid)
     for d in [sess['cache_dir'], sess['pkg_dir']]:
-        if os.path.exists(d):
-            shutil.rmtree(d)
-        os.makedirs(d, exist_ok=True)
+        _reset_dir(d)
     _update_session(sid,
         status='idle', progress=0, message='', saved_count=0,
         video_path='', video_name='', cancel_flag=False,
@@ -1421,6 +2112,7 @@ def cleanup_all():
         if sess:
             with sess['lock']:
                 sess['cancel_flag'] = True
+                _publish_state(sess)
     time.sleep(0.3)
     for sid in sids:
         _delete_session(sid)
@@ -1446,6 +2138,13 @@ def gpu_info():
 # ============================================================
 @app.route('/api/system/status')
 def system_status():
+    global _sys_status_cache
+    _mark_metrics_wanted()
+    now = time.monotonic()
+    cached = _sys_status_cache
+    if now - cached['ts'] < _SYS_STATUS_TTL:
+        return Response(cached['body'], mimetype='application/json')
+
     result = {
         'cpu_percent': 0,
         'memory_percent': 0,
@@ -1471,12 +2170,11 @@ def system_status():
     if HAS_PSUTIL:
         try:
             result['cpu_percent'] = _cpu_cache['percent']
-            mem = psutil.virtual_memory()
+            mem, disk = _sampled_mem_disk()
             result['memory_percent'] = mem.percent
             result['memory_used_gb'] = round(mem.used / (1024**3), 1)
             result['memory_total_gb'] = round(mem.total / (1024**3), 1)
 
-            disk = psutil.disk_usage(BASE_DIR)
             result['disk_free_gb'] = round(disk.free / (1024**3), 1)
             result['disk_total_gb'] = round(disk.total / (1024**3), 1)
             result['disk_percent'] = disk.percent
@@ -1493,16 +2191,19 @@ def system_status():
     if warnings:
         result['warning'] = '；'.join(warnings)
 
-    return jsonify(result)
+    body = json_bytes(result)
+    # 整体替换字典，避免并发请求读到 ts 与 body 不匹配的中间状态
+    _sys_status_cache = {'ts': now, 'body': body}
+    return Response(body, mimetype='application/json')
 
 
 def _check_resource_warning():
     if not HAS_PSUTIL:
         return None
+    _mark_metrics_wanted()
     try:
         cpu = _cpu_cache['percent']
-        mem = psutil.virtual_memory()
-        disk = psutil.disk_usage(BASE_DIR)
+        mem, disk = _sampled_mem_disk()
         warnings = []
         if cpu > CPU_WARN_THRESHOLD:
             warnings.append(f'CPU 使用率 {cpu:.0f}% 超过 {CPU_WARN_THRESHOLD}%')
@@ -1522,7 +2223,9 @@ def _check_resource_warning():
 def heartbeat():
     global _last_heartbeat, _heartbeat_received
     _last_heartbeat = time.time()
-    _heartbeat_received = True
+    if not _heartbeat_received:
+        _heartbeat_received = True
+        _watcher_wake.set()  # 首次心跳：巡检线程开始按心跳截止时间检查
     # 更新请求中携带的会话的活跃时间
     try:
         data = request.get_json(silent=True) or {}
@@ -1530,8 +2233,7 @@ def heartbeat():
         for sid in sids:
             sess = _get_session(sid)
             if sess:
-                with sess['lock']:
-                    sess['last_active'] = time.time()
+                sess['last_active'] = time.time()  # 无锁写入，同 SSE 推送路径
     except Exception:
         pass
     return jsonify(ok=True)
@@ -1545,6 +2247,15 @@ def shutdown():
     return jsonify(ok=True)
 
 
+def _dir_has_images(path):
+    """目录中是否至少有一张图片（找到第一张即停止，目录不存在视为无）"""
+    try:
+        with os.scandir(path) as it:
+            return any(_is_img_name(e.name) for e in it)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
 def _do_cleanup(force=False):
     """清理临时文件。force=True 时强制删除所有，否则保留有提取成果的会话。"""
     # 取消所有运行中的批量任务
@@ -1553,22 +2264,22 @@ def _do_cleanup(force=False):
     except Exception:
         pass
     if force:
-        if os.path.exists(SESSIONS_ROOT):
-            shutil.rmtree(SESSIONS_ROOT, ignore_errors=True)
+        # rmtree(ignore_errors=True) 自行处理目录不存在的情况，无需先 exists
+        shutil.rmtree(SESSIONS_ROOT, ignore_errors=True)
     else:
+        # 先写出尚未落盘的元数据，保证下次启动能恢复 / 断点续传
+        _flush_session_meta()
         # 只清理空会话，保留有提取成果的会话用于恢复
-        if os.path.exists(SESSIONS_ROOT):
-            for name in os.listdir(SESSIONS_ROOT):
-                sess_dir = os.path.join(SESSIONS_ROOT, name)
-                if not os.path.isdir(sess_dir):
-                    continue
-                cache_dir = os.path.join(sess_dir, 'cache')
-                has_images = False
-                if os.path.exists(cache_dir):
-                    has_images = any(f.lower().endswith(('.jpg', '.jpeg', '.png'))
-                                     for f in os.listdir(cache_dir))
-                if not has_images:
-                    shutil.rmtree(sess_dir, ignore_errors=True)
+        # scandir 的目录项自带类型信息，无需逐个 isdir / exists；
+        # 不跟随符号链接：既省去对链接目标的 stat，也避免 rmtree 误删链接指向的目录
+        try:
+            with os.scandir(SESSIONS_ROOT) as it:
+                sess_dirs = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+        except FileNotFoundError:
+            sess_dirs = []
+        for sess_dir in sess_dirs:
+            if not _dir_has_images(os.path.join(sess_dir, 'cache')):
+                shutil.rmtree(sess_dir, ignore_errors=True)
     # 清理端口文件
     port_file = os.path.join(BASE_DIR, '.vidslide_port')
     if os.path.exists(port_file):
@@ -1964,17 +2675,40 @@ def batch_auto_increment():
     return jsonify(success=True, names=names)
 
 
+def _has_detached_sessions():
+    """是否存在没有 SSE 连接的会话（孤儿清理候选）"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    for sess in sessions:
+        with sess['lock']:
+            if not sess['event_queues']:
+                return True
+    return False
+
+
 def _heartbeat_watcher():
+    interval = _WATCHER_POLL
     while True:
-        time.sleep(5)
+        if _watcher_wake.wait(interval):
+            # 新建会话 / SSE 断开 / 首次心跳：切回短周期，下一轮再清理（给页面刷新重连留出时间）
+            _watcher_wake.clear()
+            interval = _WATCHER_POLL
+            continue
         # 定期清理孤儿会话（无论心跳是否收到）
         try:
             _cleanup_orphan_sessions()
         except Exception:
             pass
+        try:
+            detached = _has_detached_sessions()
+        except Exception:
+            detached = True
         if not _heartbeat_received:
+            # 尚未收到心跳时无需检查超时，空闲则等待唤醒
+            interval = _WATCHER_POLL if detached else None
             continue
         elapsed = time.time() - _last_heartbeat
+        interval = _WATCHER_POLL if detached else max(_WATCHER_IDLE_POLL, HEARTBEAT_TIMEOUT - elapsed)
         if elapsed > HEARTBEAT_TIMEOUT:
             if _has_active_work():
                 # 有活跃任务或未导出的成果，延长等待
@@ -1990,28 +2724,45 @@ def _heartbeat_watcher():
 # ============================================================
 #  启动
 # ============================================================
+def _werkzeug_supports_chunked():
+    """已安装的 Werkzeug 是否 ≥ 2.1（dev server 对无 Content-Length 的流式响应做 chunked 编码）"""
+    try:
+        from importlib.metadata import version
+        major, minor = (int(x) for x in re.findall(r'\d+', version('werkzeug'))[:2])
+        return (major, minor) >= (2, 1)
+    except Exception:
+        # 打包后的 exe 可能不带包元数据；requirements.txt 已要求 werkzeug>=2.1
+        return True
+
+
+def _port_is_free(port):
+    # 不设 SO_REUSEADDR：Windows 下它允许绑定已被监听的端口，会误判为空闲
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', port))
+        return True
+    except OSError:
+        return False
+
+
 def _find_free_port(start=5873):
     # 优先尝试上次使用的端口（方便浏览器刷新恢复）
     port_file = os.path.join(BASE_DIR, '.vidslide_port')
-    if os.path.exists(port_file):
-        try:
-            with open(port_file) as f:
-                last_port = int(f.read().strip())
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.bind(('127.0.0.1', last_port))
-            s.close()
+    try:
+        with open(port_file) as f:
+            last_port = int(f.read().strip())
+        if _port_is_free(last_port):
             return last_port
-        except Exception:
-            pass
-    for port in range(start, start + 100):
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.bind(('127.0.0.1', port))
-            s.close()
+    except (OSError, ValueError):
+        pass
+    # 固定端口段通常首个即可用（书签 / 刷新地址保持稳定）
+    for port in range(start, start + 20):
+        if _port_is_free(port):
             return port
-        except OSError:
-            continue
-    return start
+    # 端口段全被占用：交给系统分配一个空闲端口，一次完成
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
 
 
 def _write_port_file(port):
@@ -2109,6 +2860,14 @@ if __name__ == '__main__':
         log = logging.getLogger('werkzeug')
         log.setLevel(logging.ERROR)
 
+        # 不能换 waitress（会缓冲 SSE 流式响应，见 DEVNOTES），改为让 dev server
+        # 使用 HTTP/1.1 keep-alive：轮询/心跳/图片请求复用 TCP 连接，
+        # 不必每次重新握手并新建处理线程；SSE 无 Content-Length 时自动走 chunked 编码。
+        # Werkzeug 2.1 之前的 dev server 不会对流式响应做 chunked 编码，保持 HTTP/1.0
+        if _werkzeug_supports_chunked():
+            from werkzeug.serving import WSGIRequestHandler
+            WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+
         app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
 
     except Exception as e:
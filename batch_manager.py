@@ -10,18 +10,19 @@
 
 import cv2
 import gc
-import json
 import os
 import queue
 import re
 import shutil
+import struct
 import threading
 import time
 import uuid
 from pathlib import Path
 
 from extractor import extract_slides
-from exporter import package_images
+from exporter import package_images, write_zip_entry
+from jsonio import SSE_MAX_BATCH, json_bytes, json_loads, sse_data
 
 try:
     import psutil
@@ -29,6 +30,7 @@ try:
 except ImportError:
     HAS_PSUTIL = False
 
+
 # ============================================================
 #  配置
 # ============================================================
@@ -108,7 +110,7 @@ def _new_batch(base_dir, params, max_workers=1):
         'batch_dir': batch_dir,
         # 同步原语
         'lock': threading.RLock(),
-        'event_queues': [],
+        'event_queues': set(),
         'queue_auto_pause': False,      # 处理完当前视频后暂停
         'worker_semaphore': threading.Semaphore(max_workers),
         'dispatcher_thread': None,
@@ -193,6 +195,13 @@ def _task_snapshot(t):
     }
 
 
+def _signal_cancel(t):
+    """唤醒正在运行的提取循环（需在 batch['lock'] 内、置位 cancel_flag 后调用）"""
+    ev = t.get('_cancel_event')
+    if ev is not None:
+        ev.set()
+
+
 def _find_task(batch, vid):
     """在 batch 中查找 vid 对应的 task（需在 batch['lock'] 内调用）"""
     for t in batch['tasks']:
@@ -236,7 +245,7 @@ def get_video_metadata(video_path):
         # PyAV 检测失败时用 OpenCV fourcc 作为备选
         if not codec_name:
             fourcc_int = int(cap.get(cv2.CAP_PROP_FOURCC))
-            codec_name = ''.join(chr((fourcc_int >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+            codec_name = struct.pack('<I', fourcc_int & 0xFFFFFFFF).decode('ascii', 'replace').strip('\x00')
         cap.release()
         return fps, (w, h), total_frames, codec_name
     except Exception:
@@ -881,9 +890,14 @@ def _video_worker(bid, vid):
                 _last_meta_save[0] = now
                 _save_batch_meta(bid)
 
-        def should_cancel():
-            with batch['lock']:
-                return task.get('cancel_flag', False) or task.get('_pending_trash', False)
+        # 取消信号：cancel_flag / _pending_trash 置位时同步 set，
+        # 提取循环每帧只读 Event，无需争用 batch['lock']
+        cancel_event = threading.Event()
+        with batch['lock']:
+            task['_cancel_event'] = cancel_event
+            if task.get('cancel_flag', False) or task.get('_pending_trash', False):
+                cancel_event.set()
+        should_cancel = cancel_event.is_set
 
         status, message, saved_count = extract_slides(
             task['video_path'],
@@ -993,7 +1007,7 @@ def _push_batch_event(bid, event_data):
     if not batch:
         return
     with batch['lock']:
-        queues = list(batch['event_queues'])
+        queues = tuple(batch['event_queues'])
     for eq in queues:
         try:
             eq.put_nowait(event_data)
@@ -1009,31 +1023,43 @@ def generate_batch_sse(bid):
 
     event_q = queue.Queue(maxsize=MAX_SSE_QUEUE_SIZE)
     with batch['lock']:
-        batch['event_queues'].append(event_q)
+        batch['event_queues'].add(event_q)
 
     def cleanup():
         with batch['lock']:
-            try:
-                batch['event_queues'].remove(event_q)
-            except ValueError:
-                pass
+            batch['event_queues'].discard(event_q)
 
     def generate():
         try:
             state = get_batch_state(bid)
             if state:
-                yield f'data: {json.dumps({"type": "init", "state": state}, ensure_ascii=False)}\n\n'
+                yield sse_data({'type': 'init', 'state': state})
             while True:
                 try:
                     event = event_q.get(timeout=15)
                 except queue.Empty:
-                    yield ': keepalive\n\n'
+                    yield b': keepalive\n\n'
                     if not get_batch(bid):
                         break
                     continue
-                if event.get('type') == 'close':
+                # 顺带取出已积压的事件，拼成一次写出（前端仍按独立 SSE 帧解析）
+                frames = []
+                closing = False
+                while True:
+                    if event.get('type') == 'close':
+                        closing = True
+                        break
+                    frames.append(sse_data(event))
+                    if len(frames) >= SSE_MAX_BATCH:
+                        break
+                    try:
+                        event = event_q.get_nowait()
+                    except queue.Empty:
+                        break
+                if frames:
+                    yield b''.join(frames)
+                if closing:
                     break
-                yield f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
         except GeneratorExit:
             pass
         finally:
@@ -1220,8 +1246,8 @@ def _save_batch_meta(bid):
                 meta['tasks'].append(task_meta)
             meta_path = os.path.join(batch['batch_dir'], 'batch.json')
 
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(meta, f, ensure_ascii=False, indent=2)
+        with open(meta_path, 'wb') as f:
+            f.write(json_bytes(meta, indent=True))
     except Exception as e:
         print(f'[批量持久化] 保存失败: {e}')
 
@@ -1238,8 +1264,9 @@ def recover_batches_from_disk(sessions_root):
         if not os.path.isfile(meta_path):
             continue
         try:
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
+            with open(meta_path, 'rb') as f:
+                data = f.read()
+            meta = json_loads(data)
             bid = meta.get('id')
             if not bid:
                 continue
@@ -1256,7 +1283,7 @@ def recover_batches_from_disk(sessions_root):
                 'created_at': meta.get('created_at', time.time()),
                 'batch_dir': batch_dir,
                 'lock': threading.RLock(),
-                'event_queues': [],
+                'event_queues': set(),
                 'queue_auto_pause': False,
                 'worker_semaphore': threading.Semaphore(meta.get('max_workers', 1)),
                 'dispatcher_thread': None,
@@ -1369,7 +1396,13 @@ def package_batch_video(bid, vid, fmt):
     if not images:
         return None, '没有可导出的图片'
 
+    _last_push = [-1, 0.0]  # [pct, time]：百分比未变且不足 100 ms 的回调合并掉
+
     def on_progress(pct, msg):
+        now = time.time()
+        if pct == _last_push[0] and now - _last_push[1] < 0.1:
+            return
+        _last_push[0], _last_push[1] = pct, now
         _push_batch_event(bid, {
             'type': 'packaging',
             'video_id': vid,
@@ -1470,13 +1503,17 @@ def package_batch_all(bid, fmt='zip', video_ids=None):
                 'progress': 85,
                 'message': '正在打包为 ZIP…',
             })
-            with _zipfile.ZipFile(output_path, 'w', _zipfile.ZIP_DEFLATED) as zf:
+            # PDF/PPTX 内部已压缩，直接存储
+            with _zipfile.ZipFile(output_path, 'w', _zipfile.ZIP_STORED) as zf:
                 for filepath, arcname in generated_files:
-                    zf.write(filepath, arcname)
+                    write_zip_entry(zf, filepath, arcname)
         else:
             total_images = sum(t['saved_count'] for t in done_tasks)
             processed = 0
-            with _zipfile.ZipFile(output_path, 'w', _zipfile.ZIP_DEFLATED) as zf:
+            # 每张图片都推送会产生上千条 SSE：百分比未变且距上次不足 100 ms 时跳过
+            last_pct, last_push = -1, 0.0
+            # JPEG/PNG 已压缩，直接存储
+            with _zipfile.ZipFile(output_path, 'w', _zipfile.ZIP_STORED) as zf:
                 for task in done_tasks:
                     cache_dir = task['cache_dir']
                     folder_name = unique_names[task['id']]
@@ -1487,9 +1524,13 @@ def package_batch_all(bid, fmt='zip', video_ids=None):
                     for img_name in images:
                         img_path = os.path.join(cache_dir, img_name)
                         arcname = f'{folder_name}/{img_name}'
-                        zf.write(img_path, arcname)
+                        write_zip_entry(zf, img_path, arcname)
                         processed += 1
                         pct = int(processed / total_images * 95) if total_images > 0 else 0
+                        now = time.time()
+                        if pct == last_pct and now - last_push < 0.1:
+                            continue
+                        last_pct, last_push = pct, now
                         _push_batch_event(bid, {
                             'type': 'batch_packaging',
                             'progress': pct,
@@ -1531,12 +1572,15 @@ def get_video_images(bid, vid):
                 return []
         else:
             cache_dir = task['cache_dir']
-    if not os.path.isdir(cache_dir):
+    # scandir 一次遍历，不存在时直接捕获异常，省去额外的 isdir 检查
+    try:
+        with os.scandir(cache_dir) as it:
+            imgs = [e.name for e in it
+                    if e.name.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    return sorted([
-        f for f in os.listdir(cache_dir)
-        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-    ])
+    imgs.sort()
+    return imgs
 
 
 def get_video_image_path(bid, vid, filename):
@@ -1737,6 +1781,7 @@ def trash_video(bid, vid):
             # 标记等待取消后移入回收站
             task['cancel_flag'] = True
             task['_pending_trash'] = True
+            _signal_cancel(task)
             task['message'] = '正在取消…'
             _push_batch_event(bid, {
                 'type': 'video_status',
@@ -2026,6 +2071,7 @@ def cleanup_batch(bid):
         for t in batch['tasks']:
             if t['status'] == 'running':
                 t['cancel_flag'] = True
+                _signal_cancel(t)
     batch_dir = batch.get('batch_dir', '')
     if batch_dir and os.path.isdir(batch_dir):
         shutil.rmtree(batch_dir, ignore_errors=True)
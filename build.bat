@@ -49,6 +49,7 @@ pyinstaller --onefile --noconsole ^
     --hidden-import extractor ^
     --hidden-import exporter ^
     --hidden-import batch_manager ^
+    --hidden-import jsonio ^
     --hidden-import av ^
     --collect-all av ^
     --name "VidSlide" ^
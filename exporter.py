@@ -9,6 +9,7 @@
 """
 
 import os
+import shutil
 import zipfile
 from pathlib import Path
 from PIL import Image
@@ -20,10 +21,33 @@ try:
 except ImportError:
     HAS_PPTX = False
 
+try:
+    import img2pdf
+    HAS_IMG2PDF = True
+except ImportError:
+    HAS_IMG2PDF = False
+
+
+# PDF 分批写入的每批页数：只有当前批次的图片驻留内存
+_PDF_PAGES_PER_CHUNK = 20
+
+
+def _open_rgb(path):
+    """打开图片并确保为 RGB 模式（JPEG 本身已是 RGB 时不做拷贝）"""
+    im = Image.open(path)
+    if im.mode != 'RGB':
+        rgb = im.convert('RGB')
+        im.close()
+        return rgb
+    return im
+
 
 def package_pdf(paths, output_path, on_progress=None):
     """
     将图片列表打包为 PDF 文件。
+    安装了 img2pdf 且均为 JPEG 时直接嵌入原始数据；否则由 Pillow
+    按批次打开图片并追加写入（append=True），写完即关闭，
+    峰值内存与批次大小相关，而与总页数无关。
 
     Args:
         paths:       图片文件路径列表
@@ -34,16 +58,30 @@ def package_pdf(paths, output_path, on_progress=None):
     if on_progress:
         on_progress(0, '正在生成 PDF…')
 
-    imgs = []
-    for i, p in enumerate(paths):
-        imgs.append(Image.open(p).convert('RGB'))
+    # 全部为 JPEG 时优先用 img2pdf：原样嵌入 JPEG 数据流，不解码、不重新编码
+    # （Pillow 会解码后再以默认质量重新压缩一遍）；72 DPI 与 Pillow 的页面尺寸一致
+    if HAS_IMG2PDF and all(Path(p).suffix.lower() in ('.jpg', '.jpeg') for p in paths):
+        try:
+            with open(output_path, 'wb') as f:
+                img2pdf.convert(paths, outputstream=f,
+                                layout_fun=img2pdf.get_fixed_dpi_layout_fun((72, 72)))
+            if on_progress:
+                on_progress(100, 'PDF 生成完成')
+            return
+        except Exception as e:
+            print(f'[PDF] img2pdf 失败，回退 Pillow: {e}')
+
+    for start in range(0, total, _PDF_PAGES_PER_CHUNK):
+        chunk = [_open_rgb(p) for p in paths[start:start + _PDF_PAGES_PER_CHUNK]]
+        try:
+            chunk[0].save(output_path, 'PDF', save_all=True,
+                          append_images=chunk[1:], append=start > 0)
+        finally:
+            for im in chunk:
+                im.close()
+        done = min(start + _PDF_PAGES_PER_CHUNK, total)
         if on_progress:
-            on_progress(int((i + 1) / total * 80), f'正在处理第 {i + 1}/{total} 张图片…')
-
-    if on_progress:
-        on_progress(85, '正在写入 PDF 文件…')
-
-    imgs[0].save(output_path, save_all=True, append_images=imgs[1:])
+            on_progress(int(done / total * 95), f'正在写入第 {done}/{total} 页…')
 
     if on_progress:
         on_progress(100, 'PDF 生成完成')
@@ -87,6 +125,30 @@ def package_pptx(paths, output_path, on_progress=None):
         on_progress(100, 'PPTX 生成完成')
 
 
+# ZIP 写入时的拷贝缓冲区（默认 8 KiB 对 MB 级图片需要数百次读写调用）
+_ZIP_COPY_BUFFER = 1024 * 1024
+# 内部已压缩的格式：再做 DEFLATE 几乎不缩小体积，直接存储
+_PRECOMPRESSED_SUFFIXES = frozenset({'.jpg', '.jpeg', '.png', '.pdf', '.pptx', '.zip'})
+
+
+def write_zip_entry(zf, path, arcname):
+    """
+    将文件写入 ZIP，保留文件修改时间和权限。压缩方式按条目选择：
+    已压缩格式 ZIP_STORED，以 1 MiB 缓冲区流式拷贝（替代 zf.write 的 8 KiB 分块）；
+    其余 ZIP_DEFLATED（level 1，只求快速去冗余），这类文件（元数据等）体积小，
+    整体读入后经公开 API writestr 写入，压缩级别不依赖 ZipInfo 的私有属性。
+    """
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    if Path(path).suffix.lower() not in _PRECOMPRESSED_SUFFIXES:
+        with open(path, 'rb') as src:
+            data = src.read()
+        zf.writestr(zinfo, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        return
+    zinfo.compress_type = zipfile.ZIP_STORED
+    with open(path, 'rb') as src, zf.open(zinfo, 'w') as dst:
+        shutil.copyfileobj(src, dst, _ZIP_COPY_BUFFER)
+
+
 def package_zip(paths, output_path, on_progress=None):
     """
     将图片列表打包为 ZIP 压缩文件。
@@ -100,11 +162,12 @@ def package_zip(paths, output_path, on_progress=None):
     if on_progress:
         on_progress(0, '正在创建 ZIP…')
 
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+    # JPEG/PNG 本身已压缩，DEFLATE 几乎不再缩小体积，直接存储（ZIP_STORED）
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as zf:
         for i, p in enumerate(paths):
-            zf.write(p, f'slide_{i + 1:03d}{Path(p).suffix}')
+            write_zip_entry(zf, p, f'slide_{i + 1:03d}{Path(p).suffix}')
             if on_progress:
-                on_progress(int((i + 1) / total * 95), f'正在压缩第 {i + 1}/{total} 张图片…')
+                on_progress(int((i + 1) / total * 95), f'正在打包第 {i + 1}/{total} 张图片…')
 
     if on_progress:
         on_progress(100, 'ZIP 打包完成')
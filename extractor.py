@@ -12,8 +12,11 @@ import cv2
 import gc
 import numpy as np
 import os
+import queue
+import threading
 import time
 import traceback
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 
 try:
@@ -28,6 +31,17 @@ try:
 except ImportError:
     HAS_PYAV = False
 
+# 可选：PyTurboJPEG 直接调用 libjpeg-turbo 的 SIMD 编码，比 cv2.imencode 更快；
+# 未安装 PyTurboJPEG 或找不到 libturbojpeg 动态库时回退 cv2
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    _tj = TurboJPEG()
+    HAS_TURBOJPEG = True
+except Exception as _tj_err:
+    _tj = None
+    HAS_TURBOJPEG = False
+    print(f'[JPEG] PyTurboJPEG 不可用，使用 OpenCV 编码（{type(_tj_err).__name__}）')
+
 
 # ── GPU 硬件加速探测（应用启动时调用一次，结果缓存） ──
 _gpu_probe_cache = None
@@ -126,6 +140,137 @@ def _lower_process_priority():
         print(f'[优化] 降低优先级失败（不影响运行）: {e}')
 
 
+def lower_thread_priority():
+    """
+    仅降低当前线程的调度优先级（后台提取 / 打包线程调用），
+    Flask 请求线程（SSE、心跳、图片）保持正常优先级，CPU 饱和时界面仍然流畅。
+    """
+    try:
+        if os.name == 'nt':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -1)  # THREAD_PRIORITY_BELOW_NORMAL
+        else:
+            # Linux 下 nice 值按线程生效，之后由该线程创建的解码线程也会继承
+            tid = threading.get_native_id()
+            cur = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, min(19, cur + 5))
+    except Exception:
+        pass  # 不支持按线程调整（如 macOS）时保持默认优先级
+
+
+class _FramePrefetcher:
+    """
+    后台预解码：在独立线程中推进解码迭代器，结果放入有界队列，
+    使解码与帧差对比 / 稳定检测并行。队列满时解码线程阻塞（背压），内存占用有上限。
+    迭代器抛出的异常会转交给消费方在 next() 时重新抛出。
+    """
+
+    _DONE = object()
+
+    def __init__(self, it, maxsize):
+        self._it = it
+        self._q = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name='frame_prefetch', daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        # 不再调用 lower_thread_priority：Linux 下新线程继承创建者（提取线程）已降低的 nice 值，
+        # 再降一次会让解码线程的优先级低于消费方，CPU 紧张时预取反而跟不上
+        try:
+            for item in self._it:
+                if not self._put(item):
+                    return
+            self._put(self._DONE)
+        except Exception as e:
+            self._put(e)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        item = self._q.get()
+        if item is self._DONE:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, Exception):
+            self._finished = True
+            raise item
+        return item
+
+    def close(self):
+        """停止并等待解码线程退出（关闭容器前必须调用，避免与解码并发）"""
+        self._stop.set()
+        self._thread.join()
+
+
+# ── PPT 区域裁剪比例（延河课堂录屏：顶部标题栏 + 左侧讲师画面） ──
+ROI_TOP_RATIO = 0.185
+ROI_LEFT_RATIO = 0.208
+
+
+def probe_video_meta(video_path):
+    """
+    只解析容器头（不解码任何帧）获取视频元数据，用于提取前的快速预检。
+
+    Returns:
+        (codec_name, total_frames, fps)；PyAV 不可用或解析失败时返回 None，
+        调用方应回退到 cv2.VideoCapture
+    """
+    if not HAS_PYAV:
+        return None
+    try:
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            fps = float(stream.average_rate or stream.guessed_rate or 0)
+            total = stream.frames
+            if not total and fps > 0:
+                # 部分容器（mkv / webm / ts）不记录帧数，按时长估算
+                if stream.duration and stream.time_base:
+                    duration = float(stream.duration * stream.time_base)
+                else:
+                    duration = (container.duration or 0) / av.time_base
+                total = int(duration * fps)
+            return stream.codec_context.name, int(total), fps
+    except Exception:
+        return None
+
+
+# ── OpenCL (T-API) 探测：首次调用时检测，结果缓存 ──
+_opencl_cache = None
+
+
+def _opencl_available():
+    """检测 OpenCV T-API 是否可用（Intel 核显 / AMD / NVIDIA 的 OpenCL 驱动），可用则开启"""
+    global _opencl_cache
+    if _opencl_cache is not None:
+        return _opencl_cache
+    ok = False
+    try:
+        if cv2.ocl.haveOpenCL():
+            cv2.ocl.setUseOpenCL(True)
+            ok = cv2.ocl.useOpenCL()
+    except (AttributeError, cv2.error):
+        ok = False
+    _opencl_cache = ok
+    if ok:
+        print('[OpenCL] T-API 可用，帧差对比可由 GPU 执行')
+    return ok
+
+
 def _open_video_capture(video_path, use_gpu=True):
     """
     打开视频文件。
@@ -133,31 +278,41 @@ def _open_video_capture(video_path, use_gpu=True):
     当 use_gpu=False 时直接使用 CPU 软解。
     """
     if use_gpu:
-        try:
-            params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
-            cap = cv2.VideoCapture(video_path, cv2.CAP_ANY, params)
+        # 优先显式指定 FFmpeg 后端（D3D11VA / VAAPI / VideoToolbox 由其自动选择，
+        # HW_DEVICE=-1 表示自动选设备）；Windows 下 CAP_ANY 可能落到 MSMF，seek 受限
+        params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+                  cv2.CAP_PROP_HW_DEVICE, -1]
+        for backend in (cv2.CAP_FFMPEG, cv2.CAP_ANY):
+            try:
+                cap = cv2.VideoCapture(video_path, backend, params)
+            except (AttributeError, cv2.error) as e:
+                print(f'[GPU] 硬件加速不可用 ({e})')
+                continue
             if cap.isOpened():
                 hw_accel = int(cap.get(cv2.CAP_PROP_HW_ACCELERATION))
                 if hw_accel != 0:
-                    print(f'[GPU] 已启用硬件加速解码 (type={hw_accel})')
+                    print(f'[GPU] 已启用硬件加速解码 (backend={cap.getBackendName()}, type={hw_accel})')
                 else:
                     print('[GPU] 硬件加速未生效（当前 GPU 可能不支持该编码的硬件解码），使用 CPU 解码')
                 return cap
-        except (AttributeError, cv2.error) as e:
-            print(f'[GPU] 硬件加速不可用 ({e})，回退到 CPU 解码')
+            cap.release()
+        print('[GPU] 硬件加速打开失败，回退到 CPU 解码')
     else:
         print('[CPU] 用户选择 CPU 解码模式')
 
-    # 回退 / CPU 模式: 纯 CPU 解码
-    cap = cv2.VideoCapture(video_path)
-    return cap
+    # 回退 / CPU 模式: 纯 CPU 解码，同样优先 FFmpeg 后端（seek / grab 行为与 GPU 路径一致）
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    if cap.isOpened():
+        return cap
+    cap.release()
+    return cv2.VideoCapture(video_path)
 
 
 def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                    max_history=5, use_roi=True, fast_mode=True, use_gpu=True,
                    speed_mode='eco', classroom_mode='ppt',
                    on_progress=None, should_cancel=None,
-                   start_frame=0, saved_offset=0):
+                   start_frame=0, saved_offset=0, on_saved=None):
     """
     从视频中提取幻灯片截图。
 
@@ -176,6 +331,8 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
         should_cancel:   取消检查回调 () -> bool
         start_frame:     断点续传：从第几帧开始（0=从头）
         saved_offset:    断点续传：已有图片数量（文件命名偏移）
+        on_saved:        可选，图片写盘后回调 (filename, jpeg_bytes)，在保存排序线程中按序调用，
+                         用于调用方缓存已编码的 JPEG（提供时总是走 imencode 路径）
 
     Returns:
         (status, message, saved_count) 元组
@@ -197,7 +354,14 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
     cap = None
     history_pool = None
     saved = 0
-
+    # 提前声明，保证任何提前 return / 异常路径下 finally 都能安全回收
+    _av_container = None
+    _prefetcher = None
+    _save_pool = None
+    _save_order = queue.Queue()  # 按保存顺序排列的结果通道
+    _save_drainer = None
+
+    lower_thread_priority()
     try:
         # ── 根据运行模式配置节流和优先级 ──
         _is_turbo = (speed_mode == 'turbo')
@@ -213,6 +377,9 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
             _lower_process_priority()
 
         _GC_EVERY_N_FRAMES = 500  # 每 500 帧强制 gc.collect() 防 OOM
+        # 逐帧进度回调限频到约 10 Hz（百分比变化、保存新图时仍立即推送），
+        # 减少会话更新与 SSE 序列化次数
+        _PROGRESS_INTERVAL = 0.1
 
         # ── 使用 GPU 硬件加速打开视频 ──
         cap = _open_video_capture(video_path, use_gpu=use_gpu)
@@ -253,43 +420,116 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
 
         h, w = prev_frame.shape[:2]
         if use_roi:
-            y1, y2 = int(h * 0.185), h
-            x1, x2 = int(w * 0.208), w
+            y1, y2 = int(h * ROI_TOP_RATIO), h
+            x1, x2 = int(w * ROI_LEFT_RATIO), w
         else:
             y1, y2 = 0, h
             x1, x2 = 0, w
 
-        roi_w = x2 - x1
+        roi_w, roi_h = x2 - x1, y2 - y1
         # Turbo: 320p 超低分辨率对比（像素减 55%）; Fast/Eco: 480p
-        COMPARE_WIDTH = 320 if _is_turbo else 480
-        if fast_mode and roi_w > COMPARE_WIDTH:
+        # 精确模式（fast_mode=False）也限制在 1280 宽：帧差检测只看粗结构，
+        # 2K/4K 原尺寸对比只会成倍增加 absdiff 带宽，不提升检出率
+        if fast_mode:
+            COMPARE_WIDTH = 320 if _is_turbo else 480
+        else:
+            COMPARE_WIDTH = 1280
+        if roi_w > COMPARE_WIDTH:
             _scale = COMPARE_WIDTH / roi_w
         else:
             _scale = 1.0
 
+        # ── OpenCL T-API：精确模式的大尺寸对比图交给 GPU 做 resize/cvtColor/norm ──
+        # 快速模式对比图仅 480/320 宽，上传开销大于收益；MOG2 模式需要 numpy 遮罩，均保持 CPU
+        _use_umat = (use_gpu and not fast_mode and not _use_mog2
+                     and _opencl_available())
+
+        # ROI 切片与缩放尺寸整个任务内固定，只计算一次
+        _roi_slice = (slice(y1, y2), slice(x1, x2))
+        _cmp_size = (max(1, round(roi_w * _scale)), max(1, round(roi_h * _scale)))
+        # 先转灰度再缩放：INTER_AREA 只需处理单通道（数据量为三通道的 1/3）。
+        # 全尺寸灰度中间图只在 _to_gray 内部使用，复用同一块缓冲区避免逐帧分配
+        # （缩放后的结果会被 prev_gray / 历史池引用，不能复用）
+        _gray_buf = None
+        if _scale < 1.0 and not _use_umat:
+            _gray_buf = np.empty((roi_h, roi_w), dtype=np.uint8)
+
         def _to_gray(frame):
-            roi = frame[y1:y2, x1:x2]
-            if _scale < 1.0:
-                roi = cv2.resize(roi, None, fx=_scale, fy=_scale,
-                                 interpolation=cv2.INTER_AREA)
-            return cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            roi = frame[_roi_slice]
+            if _use_umat:
+                roi = cv2.UMat(roi)
+            if _scale >= 1.0:
+                return cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=_gray_buf)
+            return cv2.resize(gray, _cmp_size, interpolation=cv2.INTER_AREA)
+
+        # PyAV 帧直接转对比灰度图：让 swscale 在 YUV→BGR 转换的同时缩放，
+        # 只转换缩小后的像素（ROI 总是延伸到右下角，缩放后从右下角裁出同尺寸区域）
+        _av_full_size = (max(1, round(w * _scale)), max(1, round(h * _scale)))
+
+        def _av_frame_to_gray(vframe):
+            if _scale >= 1.0 or _use_umat:
+                return _to_gray(vframe.to_ndarray(format='bgr24'))
+            small = vframe.to_ndarray(format='bgr24', width=_av_full_size[0],
+                                      height=_av_full_size[1], interpolation='AREA')
+            return cv2.cvtColor(small[-_cmp_size[1]:, -_cmp_size[0]:], cv2.COLOR_BGR2GRAY)
 
         prev_gray = _to_gray(prev_frame)
+        # 灰度对比图尺寸在整个任务内固定：平均差阈值预先换算为 L1 总和阈值，
+        # 逐帧只做一次比较，不再除以像素数
+        _n_px = prev_gray.get().size if _use_umat else prev_gray.size
+        _thresh_l1 = threshold * _n_px
+        _min_valid_px = _n_px * 0.10  # 掩码对比时的最少有效像素数
+        if _use_umat:
+            print('[OpenCL] 精确模式：帧差对比使用 cv2.UMat (T-API)')
+
+        def _l1(a, b):
+            """绝对差总和：cv2.norm(L1) 单遍完成 相减-取绝对值-求和，不产生中间 diff 图"""
+            return cv2.norm(a, b, cv2.NORM_L1)
+
+        def _gray_cdf(g):
+            """灰度累计直方图（256 级），用于历史池判重的快速下界"""
+            hist = cv2.calcHist([g.get() if _use_umat else g], [0], None, [256], [0, 256])
+            # 计数转整数后累加：下界计算全程整数，无浮点误差
+            return np.cumsum(hist.ravel().astype(np.int32))
+
+        # 历史池缩略图：INTER_AREA 为等权平均，缩略图平均绝对差不超过原图的平均绝对差
+        # （外加逐像素取整误差 ≤ 1），可作为比直方图更紧的空间下界，64×36 仅 2.3 KB
+        _THUMB_SIZE = (64, 36)
+        _thumb_inv_px = 1.0 / (_THUMB_SIZE[0] * _THUMB_SIZE[1])
+
+        def _gray_thumb(g):
+            return cv2.resize(g.get() if _use_umat else g, _THUMB_SIZE,
+                              interpolation=cv2.INTER_AREA)
+
         if backSub is not None:
             backSub.apply(prev_gray)  # 首帧喂入 MOG2 开始建模
-            prev_bg_mask = np.ones_like(prev_gray, dtype=np.uint8) * 255  # 首帧无前景历史
-        history_pool = [prev_gray] if enable_history else None
+            prev_bg_mask = np.full_like(prev_gray, 255, dtype=np.uint8)  # 首帧无前景历史
+        # 定长 deque：追加时自动淘汰最旧的历史帧
+        history_pool = deque([prev_gray], maxlen=max_history) if enable_history else None
+        # 历史帧累计直方图按行堆叠为 (n, 256) 矩阵，与 history_pool 一一对应；
+        # 仅在保存新图时重建（很少发生），判重时一次向量运算求出全部下界
+        history_cdfs = np.stack([_gray_cdf(prev_gray)]) if enable_history else None
+        history_thumbs = deque([_gray_thumb(prev_gray)], maxlen=max_history) if enable_history else None
 
         # ── 性能优化：JPEG 质量 / seek 跳转 / 异步保存 ──
+        # 基础质量按视频类型；全速 / 极速模式再压低上限，换取更快的编码
         _JPEG_QUALITY = 85 if _is_blackboard else 95
+        if _is_turbo:
+            _JPEG_QUALITY = min(_JPEG_QUALITY, 80)
+        elif _is_fast:
+            _JPEG_QUALITY = min(_JPEG_QUALITY, 85)
         _USE_SEEK = (backSub is not None)  # 电子课堂/实体课堂启用 seek 跳转
+        # 随机 seek 需要回退到关键帧重新解码，短跳距时反而比顺序 grab 慢，
+        # 仅跳距 ≥ 5 秒（实体课堂 10 秒步长）时才 seek，其余一律顺序 grab
+        _SEEK_MIN_FRAMES = max(1, int(fps * 5))
 
         # ── PyAV 加速：仅解码关键帧（skip_frame=NONKEY） ──
         # 对所有模式生效：PPT 模式同样受益（AV1 顺序 grab 极慢）
         # use_gpu=True 时使用启动时缓存的探测结果，直接选用最优 hw_type
-        _av_container = None
         _av_stream = None
         _keyframe_iter = None
+        _pts_to_count = None
         if HAS_PYAV:
             _pyav_hw = ''
             _codec_name = ''
@@ -343,6 +583,9 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     _keyframe_iter = None
 
             if _keyframe_iter is not None:
+                # 关键帧 pts → 帧序号的换算系数，迭代中每帧只做一次乘法
+                if _av_stream.time_base:
+                    _pts_to_count = float(_av_stream.time_base) * fps
                 _hw_label = f'GPU {_pyav_hw}' if _pyav_hw else 'CPU dav1d'
                 print(f'[PyAV] 检测到 {_codec_name}，启用关键帧快速迭代（skip_frame=NONKEY，{_hw_label}）')
 
@@ -355,7 +598,7 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     _warmup_count = 0
                     try:
                         for _wf in _keyframe_iter:
-                            _wg = _to_gray(_wf.to_ndarray(format='bgr24'))
+                            _wg = _av_frame_to_gray(_wf)  # 预训练只需灰度图，不做全分辨率 BGR 转换
                             backSub.apply(_wg, learningRate=0.02)
                             _warmup_count += 1
                     except StopIteration:
@@ -370,6 +613,12 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     else:
                         frame_step = max(1, int(fps * 3))
 
+                # 关键帧解码交给后台线程预取，主线程只做对比。
+                # 队列中是整帧（1080p 约 3 MB），且硬件解码表面数量有限，深度按模式取小值
+                _prefetch_depth = 16 if _is_turbo else (8 if _is_fast else 4)
+                _prefetcher = _FramePrefetcher(_keyframe_iter, _prefetch_depth)
+                _keyframe_iter = _prefetcher
+
         def _advance(frames_to_skip):
             """跳过指定帧数。优先用 PyAV 关键帧迭代（所有模式），失败则回退 seek/grab。"""
             nonlocal count, _keyframe_iter
@@ -383,9 +632,8 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     target_count = count + frames_to_skip
                     while True:
                         frame = next(_keyframe_iter)
-                        if frame.pts is not None and _av_stream.time_base:
-                            actual_sec = float(frame.pts * _av_stream.time_base)
-                            frame_count = int(actual_sec * fps)
+                        if frame.pts is not None and _pts_to_count:
+                            frame_count = int(frame.pts * _pts_to_count)
                         else:
                             frame_count = target_count  # 无 PTS 时直接使用
                         if frame_count >= target_count:
@@ -399,18 +647,18 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     print(f'[PyAV] 关键帧迭代失败 ({e})，回退 OpenCV')
                     _keyframe_iter = None  # 后续不再尝试
 
-            # OpenCV seek（黑板模式备选）
-            if _USE_SEEK:
+            # OpenCV seek（黑板模式备选，仅长跳距）
+            if _USE_SEEK and frames_to_skip >= _SEEK_MIN_FRAMES:
                 target_frame = count + frames_to_skip
                 seek_ok = cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
                 if seek_ok:
                     ok, frame = cap.read()
                     if ok:
-                        count = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+                        count = target_frame  # 计数器自行维护，不再回查 POS_FRAMES
                         return ok, frame
                 # seek 失败（MSMF 后端限制），回退顺序 grab
                 print(f'[Blackboard] seek 回退为顺序 grab（target={target_frame}）')
-            # PPT 模式 / seek 回退：顺序 grab
+            # PPT 模式 / 短跳距 / seek 回退：顺序 grab（跳过的帧不做颜色转换），只 retrieve 目标帧
             for _ in range(frames_to_skip):
                 count += 1
                 if not cap.grab():
@@ -418,21 +666,105 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
             ok, frame = cap.retrieve()
             return ok, frame
 
-        _save_pool = ThreadPoolExecutor(max_workers=2)
-        _save_futures = []
+        # JPEG 编码 + 写盘交给后台线程（cv2.imencode 会释放 GIL），与解码并行
+        # 每次 read / retrieve / to_ndarray 都返回新分配的数组且之后不再被修改，
+        # 因此直接把帧交给保存线程，无需整帧 copy
+        _save_workers = max(2, (os.cpu_count() or 4) // 2) if _is_fast else 2
+        _save_pool = ThreadPoolExecutor(max_workers=_save_workers, thread_name_prefix='slide_save')
 
         def _async_save(frame, filepath, quality):
-            buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1]
-            buf.tofile(filepath)
+            """编码并写盘；on_saved 需要字节时返回编码结果，否则返回 None"""
+            if _tj is not None:
+                # libjpeg-turbo 编码（释放 GIL），4:2:0 采样与 cv2 默认一致
+                data = _tj.encode(frame, quality=quality, jpeg_subsample=TJSAMP_420)
+                with open(filepath, 'wb') as f:
+                    f.write(data)
+                return data if on_saved is not None else None
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            if on_saved is not None:
+                # 调用方需要编码后的字节：imencode 一次，写盘和回调共用同一份数据
+                ok, buf = cv2.imencode('.jpg', frame, params)
+                if not ok:
+                    raise RuntimeError(f'JPEG 编码失败: {filepath}')
+                with open(filepath, 'wb') as f:
+                    f.write(buf)
+                return buf.tobytes()
+            # 纯 ASCII 路径：cv2.imwrite 由 libjpeg-turbo 直接写文件，省去编码结果的中间拷贝
+            # 含中文等非 ASCII 路径：Windows 下 imwrite 无法打开，回退 imencode + 单次 write
+            if filepath.isascii():
+                try:
+                    if cv2.imwrite(filepath, frame, params):
+                        return None
+                except cv2.error:
+                    pass
+            ok, buf = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                raise RuntimeError(f'JPEG 编码失败: {filepath}')
+            with open(filepath, 'wb') as f:
+                f.write(buf)
+            return None
+
+        # ── 有序结果通道：每张图一个容量为 1 的通道，排序线程按序号依次读取 ──
+        # 第 i 张写完即可上报，不必等同批其他图片；后完成的图片在通道里等待前序，
+        # 上报给调用方的"已提取张数"始终是连续落盘的张数，前端按序号取图不会 404
+        _progress_lock = threading.Lock()
+        _progress_args = [0, -1, 0, count]  # 最近一次的 (pct, eta, elapsed, current_frame)
+        _written = [0]
+
+        def _save_into(channel, frame, filepath, quality):
+            try:
+                channel.put((filepath, _async_save(frame, filepath, quality), None))
+            except Exception as e:
+                channel.put((filepath, None, e))
+
+        def _submit_save(frame, filepath):
+            channel = queue.Queue(maxsize=1)
+            # 提交失败（如线程池已关闭）时直接把错误放进通道，排序线程不会在该通道上永久等待
+            try:
+                _save_pool.submit(_save_into, channel, frame, filepath, _JPEG_QUALITY)
+            except Exception as e:
+                channel.put((filepath, None, e))
+            _save_order.put(channel)
+
+        def _drain_saves():
+            while True:
+                channel = _save_order.get()
+                if channel is None:
+                    return
+                filepath, data, err = channel.get()
+                if err is not None:
+                    print(f'[保存] 异步写盘失败: {err}')
+                elif data is not None:
+                    try:
+                        on_saved(os.path.basename(filepath), data)
+                    except Exception as cb_err:
+                        print(f'[保存] on_saved 回调失败: {cb_err}')
+                with _progress_lock:
+                    _written[0] += 1
+                    pct, eta, elapsed, frame_idx = _progress_args
+                    on_progress(_written[0], pct, f'已提取 {saved_offset + _written[0]} 张',
+                                eta, elapsed, frame_idx)
+
+        def _set_progress(pct, eta, elapsed, frame_idx, emit):
+            """记录主线程的最新进度；emit 时连同已落盘张数一起上报"""
+            with _progress_lock:
+                _progress_args[:] = (pct, eta, elapsed, frame_idx)
+                if emit:
+                    on_progress(_written[0], pct, f'已提取 {saved_offset + _written[0]} 张',
+                                eta, elapsed, frame_idx)
+
+        _save_drainer = threading.Thread(target=_drain_saves, name='slide_save_order', daemon=True)
+        _save_drainer.start()
 
         _extract_start_time = time.time()
+        _last_emit_time = 0.0
+        _last_emit_pct = -1
 
         # ── 保存第一帧（续传时跳过，因为断点帧只用于比较基准） ──
         if not is_resuming:
             fp = os.path.join(output_dir, f"slide_{saved_offset + saved:04d}.jpg")
-            _save_futures.append(_save_pool.submit(_async_save, prev_frame.copy(), fp, _JPEG_QUALITY))
+            _submit_save(prev_frame, fp)
             saved += 1
-            on_progress(saved, 0, f'已提取 {saved_offset + saved} 张', -1, 0, count)
         else:
             on_progress(saved, int(count / total_frames * 100),
                         f'从断点恢复，继续提取…', -1, 0, count)
@@ -456,12 +788,17 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                 return ('cancelled', f'已取消，已保存 {saved_offset + saved} 张', saved)
 
             pct = min(99, int(count / total_frames * 100))
-            elapsed = time.time() - _extract_start_time
+            now = time.time()
+            elapsed = now - _extract_start_time
             if pct > 2:
                 eta = elapsed / pct * (100 - pct)
             else:
                 eta = -1
-            on_progress(saved, pct, f'已提取 {saved_offset + saved} 张', round(eta, 1), round(elapsed, 1), count)
+            _emit = pct != _last_emit_pct or now - _last_emit_time >= _PROGRESS_INTERVAL
+            if _emit:
+                _last_emit_pct = pct
+                _last_emit_time = now
+            _set_progress(pct, round(eta, 1), round(elapsed, 1), count, _emit)
 
             curr_gray = _to_gray(curr_frame)
 
@@ -472,21 +809,20 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                 # 形态学处理：先闭合填充人物轮廓内空洞，再膨胀扩大遮罩覆盖范围
                 fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, _close_kernel)
                 fg_mask = cv2.dilate(fg_mask, _dilate_kernel, iterations=2)
+                # bitwise_not 每帧返回新数组，之后不再修改，可直接作为 prev_bg_mask 引用
                 bg_mask = cv2.bitwise_not(fg_mask)
                 # 交集掩码：同时排除人物"现在的位置"和"刚才的位置"
                 combined_bg = cv2.bitwise_and(bg_mask, prev_bg_mask)
                 valid_pixels = cv2.countNonZero(combined_bg)
-                total_pixels = curr_gray.shape[0] * curr_gray.shape[1]
-                if valid_pixels < total_pixels * 0.10:
-                    mean_diff = 0  # 人挡住了大部分画面，跳过
+                if valid_pixels < _min_valid_px:
+                    changed = False  # 人挡住了大部分画面，跳过
                 else:
-                    diff = cv2.absdiff(curr_gray, prev_gray)
-                    masked_diff = cv2.bitwise_and(diff, diff, mask=combined_bg)
-                    mean_diff = np.sum(masked_diff) / valid_pixels
+                    changed = cv2.norm(curr_gray, prev_gray, cv2.NORM_L1,
+                                       mask=combined_bg) > threshold * valid_pixels
             else:
-                mean_diff = np.mean(cv2.absdiff(curr_gray, prev_gray))
+                changed = _l1(curr_gray, prev_gray) > _thresh_l1
 
-            if mean_diff > threshold:
+            if changed:
                 if _skip_stable:
                     # ── 电子课堂 / 实体课堂：直接截图，不等稳定 ──
                     settled_frame = curr_frame
@@ -494,6 +830,7 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                 elif _keyframe_iter is not None:
                     # ── PPT + NONKEY：用后续关键帧做稳定检测（等 PPT 动画播完） ──
                     _stable_need = 1 if _is_turbo else 2
+                    _stable_l1 = max(threshold * 0.4, 2.5) * _n_px  # 关键帧间隔大，稳定判定放宽
                     stable = 0
                     last_gray = curr_gray
                     settled_frame = None
@@ -504,14 +841,12 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                         time.sleep(_THROTTLE_INTERVAL)
                         try:
                             sf = next(_keyframe_iter)
-                            if sf.pts is not None and _av_stream.time_base:
-                                count = int(float(sf.pts * _av_stream.time_base) * fps)
+                            if sf.pts is not None and _pts_to_count:
+                                count = int(sf.pts * _pts_to_count)
                             tmp_frame = sf.to_ndarray(format='bgr24')
                             tmp_gray = _to_gray(tmp_frame)
-                            if np.mean(cv2.absdiff(tmp_gray, last_gray)) < max(threshold * 0.4, 2.5):
-                                stable += 1
-                            else:
-                                stable = 0
+                            # 连续稳定计数：稳定则 +1，否则清零
+                            stable = (stable + 1) if _l1(tmp_gray, last_gray) < _stable_l1 else 0
                             last_gray = tmp_gray
                             if stable >= _stable_need:
                                 settled_frame = tmp_frame
@@ -545,10 +880,7 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                         if not ret:
                             break
                         tmp_gray = _to_gray(tmp)
-                        if np.mean(cv2.absdiff(tmp_gray, last_gray)) < 1.0:
-                            stable += 1
-                        else:
-                            stable = 0
+                        stable = (stable + 1) if _l1(tmp_gray, last_gray) < _n_px else 0
                         last_gray = tmp_gray
                         if stable >= _stable_need:
                             settled_frame = tmp
@@ -560,34 +892,48 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                     return ('cancelled', f'已取消，已保存 {saved_offset + saved} 张', saved)
 
                 if settled_gray is not None:
-                    final_diff = np.mean(cv2.absdiff(settled_gray, prev_gray))
-                    dup = False
-                    if enable_history and history_pool:
-                        for pg in history_pool:
-                            if np.mean(cv2.absdiff(settled_gray, pg)) <= threshold:
+                    # 与上一张差异不足时直接判重，无需再扫历史池
+                    dup = _l1(settled_gray, prev_gray) <= _thresh_l1
+                    settled_cdf = None
+                    settled_thumb = None
+                    if not dup and enable_history and history_pool:
+                        # 两图亮度分布的 1-D Wasserstein 距离 Σ|CDF₁-CDF₂|/N 是平均绝对差的下界：
+                        # 下界已超过阈值的历史帧必然不重复，只需 256 次运算即可排除，
+                        # 其余依次经缩略图下界、逐像素对比确认，判定结果与全量对比完全一致
+                        settled_cdf = _gray_cdf(settled_gray)
+                        settled_thumb = _gray_thumb(settled_gray)
+                        bounds = np.abs(history_cdfs - settled_cdf).sum(axis=1)
+                        # 从最新的历史帧往回比：回翻通常回到最近几页，命中即停止
+                        for i in np.flatnonzero(bounds <= _thresh_l1)[::-1]:
+                            thumb_diff = cv2.norm(settled_thumb, history_thumbs[i],
+                                                  cv2.NORM_L1) * _thumb_inv_px
+                            if thumb_diff - 1.0 > threshold:
+                                continue
+                            if _l1(settled_gray, history_pool[i]) <= _thresh_l1:
                                 dup = True
                                 break
-                    elif final_diff <= threshold:
-                        dup = True
 
-                    if not dup and final_diff > threshold:
+                    if not dup:
                         fp = os.path.join(output_dir, f"slide_{saved_offset + saved:04d}.jpg")
-                        _save_futures.append(_save_pool.submit(_async_save, settled_frame.copy(), fp, _JPEG_QUALITY))
+                        _submit_save(settled_frame, fp)
                         saved += 1
-                        on_progress(saved, pct, f'已提取 {saved_offset + saved} 张',
-                                    round(eta, 1), round(elapsed, 1), count)
                         prev_gray = settled_gray
                         if backSub is not None:
-                            prev_bg_mask = bg_mask.copy()
+                            prev_bg_mask = bg_mask
                             # 15 秒步长本身已提供足够间隔，无需额外冷却
                         if enable_history:
+                            if settled_cdf is None:
+                                settled_cdf = _gray_cdf(settled_gray)
+                                settled_thumb = _gray_thumb(settled_gray)
                             history_pool.append(settled_gray)
-                            if len(history_pool) > max_history:
-                                history_pool.pop(0)
+                            history_thumbs.append(settled_thumb)
+                            # 直方图矩阵与 deque 保持等长（只保留最新的行）
+                            history_cdfs = np.vstack([history_cdfs, settled_cdf])
+                            history_cdfs = history_cdfs[len(history_cdfs) - len(history_pool):]
                     else:
                         prev_gray = settled_gray
                         if backSub is not None:
-                            prev_bg_mask = bg_mask.copy()
+                            prev_bg_mask = bg_mask
 
         # ── 尾帧保护：捕获视频最后一帧的板书状态 ──
         # 主循环因 _advance() 到达视频末尾而 break，最后一段板书可能被跳过
@@ -601,14 +947,12 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
                 bg_mask = cv2.bitwise_not(fg_mask)
                 combined_bg = cv2.bitwise_and(bg_mask, prev_bg_mask)
                 valid_pixels = cv2.countNonZero(combined_bg)
-                total_pixels = last_gray.shape[0] * last_gray.shape[1]
-                if valid_pixels >= total_pixels * 0.10:
-                    diff = cv2.absdiff(last_gray, prev_gray)
-                    masked_diff = cv2.bitwise_and(diff, diff, mask=combined_bg)
-                    last_diff = np.sum(masked_diff) / valid_pixels
+                if valid_pixels >= _min_valid_px:
+                    last_diff = cv2.norm(last_gray, prev_gray, cv2.NORM_L1,
+                                         mask=combined_bg) / valid_pixels
                     if last_diff > threshold:
                         fp = os.path.join(output_dir, f"slide_{saved_offset + saved:04d}.jpg")
-                        _save_futures.append(_save_pool.submit(_async_save, last_frame.copy(), fp, _JPEG_QUALITY))
+                        _submit_save(last_frame, fp)
                         saved += 1
                         print(f'[Blackboard] 尾帧保护：捕获最后一帧板书（diff={last_diff:.1f}）')
 
@@ -633,16 +977,18 @@ def extract_slides(video_path, output_dir, threshold=5.0, enable_history=False,
         return ('error', f'提取出错: {err_msg}\n💡 {hint}', saved)
 
     finally:
-        # ── 等待所有异步保存完成 ──
-        for f in _save_futures:
+        # ── 先停止预解码线程，再关闭它正在使用的 PyAV 容器 ──
+        if _prefetcher is not None:
+            _prefetcher.close()
+        # ── 等待所有异步保存完成：排序线程读完全部通道后退出 ──
+        if _save_drainer is not None:
+            _save_order.put(None)
+            _save_drainer.join()
+        if _save_pool is not None:
             try:
-                f.result()
-            except Exception as save_err:
-                print(f'[保存] 异步写盘失败: {save_err}')
-        try:
-            _save_pool.shutdown(wait=False)
-        except Exception:
-            pass
+                _save_pool.shutdown(wait=True)
+            except Exception:
+                pass
         # ── 关闭 PyAV 资源 ──
         if _av_container is not None:
             try:
@@ -0,0 +1,46 @@
+"""
+影幻智提 (VidSlide) - JSON / SSE 序列化工具
+==========================================
+app.py 与 batch_manager.py 共用的 JSON 编解码和 SSE 帧构造，
+安装了 orjson 时优先使用（快 3~5 倍），否则回退标准库。
+
+作者: PWO-CHINA
+版本: v0.6.1
+"""
+
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# SSE 生成器一次最多合并写出的积压事件数
+SSE_MAX_BATCH = 16
+
+
+def json_bytes(obj, indent=False):
+    """
+    序列化为 UTF-8 JSON 字节（orjson 优先）。
+    默认紧凑输出；indent=True 时两空格缩进（用于需要人工查看的落盘文件）。
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2) if indent else orjson.dumps(obj)
+        except TypeError:
+            pass  # orjson 不支持的类型（如非 str 键）回退标准库
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data):
+    """解析 JSON 字节（orjson 优先）"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def sse_data(obj):
+    """序列化为一条 SSE data 帧（bytes，WSGI 直接写出无需再编码）"""
+    return b'data: ' + json_bytes(obj) + b'\n\n'